@@ -1,5 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException
 from typing import Dict, Any, List
+import orjson
+from .dependencies import get_event_queue
 # from .dependencies import get_rag_engine, get_entity_processor  # Uncomment when implemented
 # from ..engine.entity_extraction import EntityExtractor
 # from ..engine.entity_resolution import EntityProcessor
@@ -7,18 +9,29 @@ from typing import Dict, Any, List
 
 router = APIRouter(prefix="/api/composio", tags=["composio"])
 
+# Redis stream read by the entity-processing consumer (runs outside the API workers)
+COMPOSIO_EVENTS_STREAM = "composio_events"
+COMPOSIO_EVENTS_MAXLEN = 100_000
+
 @router.post("/webhook")
 async def composio_webhook(
     payload: Dict[str, Any],
-    background_tasks: BackgroundTasks,
-    # entity_processor: EntityProcessor = Depends(get_entity_processor)  # Uncomment when implemented
+    queue = Depends(get_event_queue)
 ):
     """
-    Webhook for Composio events
+    Webhook for Composio events. The event is appended to a Redis stream and
+    acknowledged immediately; processing happens in a separate consumer.
     """
-    event_type = payload.get("event_type")
-    # Example: background_tasks.add_task(process_new_message, ...)
-    return {"status": "processing"}
+    try:
+        await queue.xadd(
+            COMPOSIO_EVENTS_STREAM,
+            {"event_type": payload.get("event_type") or "", "payload": orjson.dumps(payload)},
+            maxlen=COMPOSIO_EVENTS_MAXLEN,
+            approximate=True
+        )
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Event queue unavailable: {str(e)}")
+    return {"status": "queued"}
 
 @router.post("/sync/{channel_type}")
 async def sync_channel(
@@ -1,46 +1,135 @@
-from fastapi import Depends
+import asyncio
+import base64
+import binascii
+import hashlib
+import hmac
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from redis import asyncio as redis_asyncio
+from backend.data_services.redis_cache import (
+    REDIS_HOST, REDIS_PORT, REDIS_DB, REDIS_USERNAME, REDIS_PASSWORD, REDIS_SSL
+)
 from ..db.graph_db import Neo4jWrapper
 from ..db.vector_db import QdrantWrapper
 from ..embeddings.embedding import EmbeddingService
+from ..embeddings.cache import CachedEmbeddingService
+from ..cache.semantic_cache import SemanticQueryCache
 from ..engine.rag_engine import GraphRAGEngine
 from ..engine.entity_extraction import EntityExtractor
 from ..engine.entity_resolution import EntityResolutionEngine
+from ..config import get_settings
 # from ..engine.entity_resolution import EntityProcessor  # To be implemented
-from GraphRAG.graphrag.config import get_settings
 
-def get_graph_db():
+def admin_token_digest(secret: Optional[str]) -> Optional[bytes]:
+    """
+    The admin bearer token is base64(HMAC-SHA256(secret, b"admin")).
+    """
+    if not secret:
+        return None
+    return hmac.new(secret.encode("utf-8"), b"admin", hashlib.sha256).digest()
+
+async def warm_up(app: FastAPI, sessions: int = 4) -> None:
+    """
+    Pay connection and model start-up costs before the first request: open and
+    exercise a few pooled Neo4j connections, run the embedding model once and
+    issue a throwaway Qdrant search.
+    """
+    graph_db = app.state.graph_db
+
+    def ping():
+        with graph_db.driver.session() as s:
+            s.run("RETURN 1").consume()
+
+    try:
+        await run_in_threadpool(graph_db.driver.verify_connectivity)
+        await asyncio.gather(*(run_in_threadpool(ping) for _ in range(sessions)))
+        vector = await run_in_threadpool(app.state.embedding_service.get_embedding, "warmup")
+        await run_in_threadpool(app.state.semantic_cache.get, vector)
+    except Exception as e:
+        print(f"Warning: warm-up failed: {str(e)}")
+
+@asynccontextmanager
+async def graphrag_lifespan(app: FastAPI):
+    """
+    Create the process-wide Neo4j driver, Qdrant client, embedding service,
+    semantic query cache and RAG engine once and share them across requests
+    via app.state.
+    """
+    app.state.graph_db = Neo4jWrapper()
+    app.state.graph_db.ensure_id_indexes()
+    app.state.vector_db = QdrantWrapper()
     settings = get_settings()
-    db = Neo4jWrapper()
+    app.state.admin_token_digest = admin_token_digest(settings.ADMIN_TOKEN_SECRET)
+    app.state.embedding_service = CachedEmbeddingService(
+        EmbeddingService(cache_size=0),
+        max_size=settings.EMBEDDING_CACHE_SIZE,
+        ttl=settings.EMBEDDING_CACHE_TTL
+    )
+    app.state.semantic_cache = SemanticQueryCache(
+        app.state.vector_db,
+        vector_size=app.state.embedding_service.embedding_dim,
+        threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+        ttl=settings.SEMANTIC_CACHE_TTL
+    )
+    # Built once: initializing the collection blocks on the model and Qdrant
+    app.state.rag_engine = GraphRAGEngine(
+        graph_db=app.state.graph_db,
+        vector_db=app.state.vector_db,
+        embedding_service=app.state.embedding_service
+    )
+    # Webhook events are handed to an external consumer through a Redis stream
+    app.state.event_queue = redis_asyncio.Redis(
+        host=REDIS_HOST,
+        port=REDIS_PORT,
+        db=REDIS_DB,
+        username=REDIS_USERNAME,
+        password=REDIS_PASSWORD,
+        ssl=REDIS_SSL,
+        socket_timeout=5,
+        socket_connect_timeout=5
+    )
+    await warm_up(app)
     try:
-        yield db
+        yield
     finally:
-        db.close()
+        await app.state.event_queue.aclose()
+        app.state.vector_db.close()
+        app.state.graph_db.close()
 
-def get_vector_db():
-    db = QdrantWrapper()
-    yield db
+async def get_graph_db(request: Request) -> Neo4jWrapper:
+    return request.app.state.graph_db
 
-def get_embedding_service():
-    service = EmbeddingService()
-    yield service
+async def get_event_queue(request: Request) -> redis_asyncio.Redis:
+    return request.app.state.event_queue
 
-def get_rag_engine(
-    graph_db: Neo4jWrapper = Depends(get_graph_db),
-    vector_db: QdrantWrapper = Depends(get_vector_db),
-    embedding_service: EmbeddingService = Depends(get_embedding_service)
-):
-    engine = GraphRAGEngine(
-        graph_db=graph_db,
-        vector_db=vector_db,
-        embedding_service=embedding_service
-    )
-    yield engine
+def get_graph_session(db: Neo4jWrapper = Depends(get_graph_db)):
+    """
+    One Neo4j session per request; FastAPI caches this dependency, so every
+    Neo4j call made while serving the request shares one pooled connection.
+    A plain generator, so opening and closing the session run in the threadpool.
+    """
+    with db.driver.session() as session:
+        yield session
+
+async def get_vector_db(request: Request) -> QdrantWrapper:
+    return request.app.state.vector_db
+
+async def get_embedding_service(request: Request) -> CachedEmbeddingService:
+    return request.app.state.embedding_service
+
+async def get_semantic_cache(request: Request) -> SemanticQueryCache:
+    return request.app.state.semantic_cache
+
+async def get_rag_engine(request: Request, graph_session = Depends(get_graph_session)) -> GraphRAGEngine:
+    return request.app.state.rag_engine.with_session(graph_session)
 
 # Placeholder for entity processor dependency
 # def get_entity_processor(
 #     graph_db: Neo4jWrapper = Depends(get_graph_db),
 #     vector_db: QdrantWrapper = Depends(get_vector_db),
-#     embedding_service: EmbeddingService = Depends(get_embedding_service)
+#     embedding_service: CachedEmbeddingService = Depends(get_embedding_service)
 # ):
 #     processor = EntityProcessor(
 #         graph_db=graph_db,
@@ -49,14 +138,30 @@ def get_rag_engine(
 #     )
 #     yield processor
 
-def get_entity_resolution_engine(
+async def get_entity_resolution_engine(
     graph_db: Neo4jWrapper = Depends(get_graph_db),
+    graph_session = Depends(get_graph_session),
     vector_db: QdrantWrapper = Depends(get_vector_db),
-    embedding_service: EmbeddingService = Depends(get_embedding_service)
+    embedding_service: CachedEmbeddingService = Depends(get_embedding_service)
 ):
-    engine = EntityResolutionEngine(
-        graph_db=graph_db,
+    return EntityResolutionEngine(
+        graph_db=graph_db.with_session(graph_session),
         vector_db=vector_db,
         embedding_service=embedding_service
-    )
-    yield engine 
\ No newline at end of file
+    ) 
+
+async def require_admin(request: Request, authorization: Optional[str] = Header(None)):
+    if not authorization:
+        raise HTTPException(
+            status_code=401,
+            detail="Missing admin credentials",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    # Unset when the lifespan hasn't run: treated like a missing secret (admin disabled)
+    expected = getattr(request.app.state, "admin_token_digest", None)
+    try:
+        token = base64.b64decode(authorization.removeprefix("Bearer "), validate=True)
+    except (binascii.Error, ValueError):
+        token = b""
+    if expected is None or not hmac.compare_digest(token, expected):
+        raise HTTPException(status_code=403, detail="Admin access required")
@@ -1,7 +1,9 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from .routes import router as main_router
 from .composio_routes import router as composio_router
+from .dependencies import graphrag_lifespan
 from GraphRAG.graphrag.config import get_settings
 
 settings = get_settings()
@@ -9,7 +11,9 @@ settings = get_settings()
 app = FastAPI(
     title="Muntu AI GraphRAG API",
     description="API for Muntu AI's GraphRAG system for multi-channel communication",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=graphrag_lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Set up CORS
@@ -1,57 +1,67 @@
-from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional
 from datetime import datetime
 
+class APIModel(BaseModel):
+    # Immutable, schema built at import time; opaque dict fields are not deep-validated
+    model_config = ConfigDict(
+        extra="ignore",
+        frozen=True,
+        populate_by_name=False,
+        validate_assignment=False,
+        defer_build=False
+    )
+
 # Request Models
-class GraphQueryRequest(BaseModel):
+class GraphQueryRequest(APIModel):
     query: str
     user_id: str
     max_results: Optional[int] = 10
     include_entities: Optional[bool] = True
     include_tasks: Optional[bool] = True
     
-class EntityRequest(BaseModel):
+class EntityRequest(APIModel):
     text: str
     type: str
-    metadata: Optional[Dict[str, Any]] = None
-    relationships: Optional[List[Dict[str, Any]]] = None
+    metadata: Optional[dict] = None
+    relationships: Optional[List[dict]] = None
     
-class GraphAddRequest(BaseModel):
+class GraphAddRequest(APIModel):
     entity: EntityRequest
     user_id: str
     source: Optional[str] = "api"
     
-class EntityResolutionRequest(BaseModel):
-    entity: Dict[str, Any]
+class EntityResolutionRequest(APIModel):
+    entity: dict
     entity_type: str
 
-class EntityMergeRequest(BaseModel):
+class EntityMergeRequest(APIModel):
     source_id: str
     target_id: str
     entity_type: str
     merge_strategy: str = "newer_wins"
 
-class BatchResolutionRequest(BaseModel):
+class BatchResolutionRequest(APIModel):
     entity_type: str
     match_threshold: float = 0.7
     limit: int = 1000
 
 # Response Models
-class EntityResponse(BaseModel):
+class EntityResponse(APIModel):
     id: str
     type: str
     text: str
-    metadata: Dict[str, Any]
+    metadata: dict
     relevance_score: Optional[float] = None
-    relationships: Optional[List[Dict[str, Any]]] = None
+    relationships: Optional[List[dict]] = None
     
-class GraphQueryResponse(BaseModel):
-    results: List[Dict[str, Any]]
+class GraphQueryResponse(APIModel):
+    results: List[dict]
     entities: Optional[List[EntityResponse]] = None
-    tasks: Optional[List[Dict[str, Any]]] = None
-    summary: Dict[str, Any]
+    tasks: Optional[List[dict]] = None
+    summary: dict
 
-class BatchResolutionResult(BaseModel):
+class BatchResolutionResult(APIModel):
     source_id: str
     target_id: str
     match_score: float
@@ -1,30 +1,22 @@
 from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+import orjson
 from pydantic import BaseModel
 from typing import Dict, Any, List, Optional
-from ..engine.rag_engine import GraphRAGEngine, run_pruning_job, archive_nodes
+from ..engine.rag_engine import run_pruning_job, archive_nodes
 from .models import (
     GraphQueryRequest, GraphAddRequest, EntityResponse, GraphQueryResponse,
     EntityResolutionRequest, EntityMergeRequest, BatchResolutionRequest, BatchResolutionResult
 )
-from .dependencies import get_rag_engine, get_entity_resolution_engine
+from .dependencies import (
+    get_graph_db, get_rag_engine, get_entity_resolution_engine, get_embedding_service, get_semantic_cache, require_admin
+)
 # from .dependencies import get_entity_processor  # Uncomment when EntityProcessor is implemented
 # from ..engine.entity_resolution import EntityProcessor
 from fastapi import status
-from fastapi.security import HTTPBasic, HTTPBasicCredentials
-import secrets
 
 router = APIRouter(prefix="/api", tags=["graphrag"])
-rag_engine = GraphRAGEngine()
-
-security = HTTPBasic()
-
-ADMIN_USERNAME = "admin"  # In production, use env vars or a secure vault
-ADMIN_PASSWORD = "changeme"  # In production, use env vars or a secure vault
-
-def is_admin(credentials: HTTPBasicCredentials) -> bool:
-    correct_username = secrets.compare_digest(credentials.username, ADMIN_USERNAME)
-    correct_password = secrets.compare_digest(credentials.password, ADMIN_PASSWORD)
-    return correct_username and correct_password
 
 class DocumentInput(BaseModel):
     document_id: str
@@ -39,32 +31,67 @@ class AdminArchiveRequest(BaseModel):
     entity_type: str
     node_ids: List[str]
 
+def _ndjson_lines(items, trailer=None):
+    for item in items:
+        yield orjson.dumps(item, default=str) + b"\n"
+    if trailer is not None:
+        yield orjson.dumps(trailer, default=str) + b"\n"
+
 @router.post("/index")
-async def index_document(document: DocumentInput):
+async def index_document(
+    document: DocumentInput,
+    rag_engine = Depends(get_rag_engine),
+    semantic_cache = Depends(get_semantic_cache)
+):
     try:
-        rag_engine.index_document(
+        await run_in_threadpool(
+            rag_engine.index_document,
             document_id=document.document_id,
             content=document.content,
             metadata=document.metadata
         )
+        # Cached answers may predate this document
+        await run_in_threadpool(semantic_cache.invalidate)
         return {"status": "success", "message": "Document indexed successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/nodes", tags=["admin"], summary="Export all nodes", description="Stream every node in the graph as NDJSON. Requires admin authentication.")
+async def export_nodes(
+    _admin = Depends(require_admin),
+    graph_db = Depends(get_graph_db)
+):
+    """
+    Stream every node in the graph as NDJSON without materializing the full node list. Requires admin authentication.
+    """
+    return StreamingResponse(_ndjson_lines(graph_db.iter_all_nodes()), media_type="application/x-ndjson")
+
 @router.post("/query", response_model=GraphQueryResponse)
 async def query_graph(
     request: GraphQueryRequest,
-    rag_engine = Depends(get_rag_engine)
+    stream: bool = Query(False, description="Stream results as NDJSON, one result per line followed by the summary"),
+    rag_engine = Depends(get_rag_engine),
+    semantic_cache = Depends(get_semantic_cache)
 ):
     """
     Query the GraphRAG engine with natural language
     """
     try:
-        results = rag_engine.retrieve_with_context(
-            query_text=request.query,
-            filters=None,
-            max_hops=2
-        )
+        query_vector = await run_in_threadpool(rag_engine.embedding_service.get_embedding, request.query)
+        results = await run_in_threadpool(semantic_cache.get, query_vector)
+        if results is None:
+            results = await run_in_threadpool(
+                rag_engine.retrieve_with_context,
+                query_text=request.query,
+                filters=None,
+                max_hops=2
+            )
+            await run_in_threadpool(semantic_cache.set, request.query, query_vector, results)
+        if stream:
+            return StreamingResponse(
+                _ndjson_lines(results.get("results", []), {"summary": results.get("graph_summary", {})}),
+                media_type="application/x-ndjson"
+            )
         response = {
             "results": results.get("results", []),
             "summary": results.get("graph_summary", {})
@@ -106,11 +133,11 @@ async def get_entity(
     Get entity details by ID
     """
     try:
-        entity = rag_engine.graph_db.get_node(label=None, match_props={"id": entity_id})
+        entity = await run_in_threadpool(rag_engine.graph_db.get_node, label=None, match_props={"id": entity_id})
         if not entity:
             raise HTTPException(status_code=404, detail="Entity not found")
         # Format as EntityResponse
-        return {"id": entity_id, "type": entity[0].get("type", "Unknown"), "text": entity[0].get("name", ""), "metadata": entity[0], "relevance_score": 1.0, "relationships": []}
+        return {"id": entity_id, "type": next(iter(entity.labels), "Unknown"), "text": entity.get("name", ""), "metadata": dict(entity), "relevance_score": 1.0, "relationships": []}
     except HTTPException:
         raise
     except Exception as e:
@@ -149,8 +176,11 @@ async def resolve_entity(
     """
     Resolve a single entity using multi-strategy matching.
     """
+    # Deliberately not behind the semantic cache: near-duplicate names (e.g. "Jon" vs
+    # "John Smith", or one name with different emails) embed within the cache threshold
+    # but must resolve to different entities, and merges change the answer
     try:
-        match = engine.resolve_entity(request.entity, request.entity_type)
+        match = await run_in_threadpool(engine.resolve_entity, request.entity, request.entity_type)
         if match:
             return {
                 "id": match.get("id", ""),
@@ -174,7 +204,8 @@ async def merge_entities(
     Merge two entities, preserving relationships and data.
     """
     try:
-        merged = engine.merge_entities(
+        merged = await run_in_threadpool(
+            engine.merge_entities,
             source_id=request.source_id,
             target_id=request.target_id,
             entity_type=request.entity_type,
@@ -200,7 +231,8 @@ async def batch_resolve_entities(
     Run batch entity resolution for a given type.
     """
     try:
-        results = engine.batch_resolve_entities(
+        results = await run_in_threadpool(
+            engine.batch_resolve_entities,
             entity_type=request.entity_type,
             match_threshold=request.match_threshold,
             limit=request.limit
@@ -212,27 +244,34 @@ async def batch_resolve_entities(
 # --- Admin Endpoints ---
 @router.post("/admin/prune", status_code=status.HTTP_202_ACCEPTED, tags=["admin"], summary="Trigger pruning job", description="Trigger the scheduled pruning and archiving job immediately. Requires admin authentication.")
 async def admin_prune(
-    credentials: HTTPBasicCredentials = Depends(security),
+    _admin = Depends(require_admin),
     rag_engine = Depends(get_rag_engine)
 ):
     """
     Trigger the scheduled pruning and archiving job immediately. Requires admin authentication.
     """
-    if not is_admin(credentials):
-        raise HTTPException(status_code=403, detail="Admin access required")
-    run_pruning_job(rag_engine.graph_db)
+    await run_in_threadpool(run_pruning_job, rag_engine.graph_db)
     return {"status": "pruning job triggered"}
 
 @router.post("/admin/archive", status_code=status.HTTP_202_ACCEPTED, tags=["admin"], summary="Archive nodes", description="Archive a batch of nodes by type and IDs. Requires admin authentication.")
 async def admin_archive(
     req: AdminArchiveRequest,
-    credentials: HTTPBasicCredentials = Depends(security),
+    _admin = Depends(require_admin),
     rag_engine = Depends(get_rag_engine)
 ):
     """
     Archive a batch of nodes by type and IDs. Requires admin authentication.
     """
-    if not is_admin(credentials):
-        raise HTTPException(status_code=403, detail="Admin access required")
-    archive_nodes(req.node_ids, req.entity_type, rag_engine.graph_db)
-    return {"status": "archive job triggered", "archived": req.node_ids} 
\ No newline at end of file
+    await run_in_threadpool(archive_nodes, req.node_ids, req.entity_type, rag_engine.graph_db)
+    return {"status": "archive job triggered", "archived": req.node_ids} 
+
+@router.get("/admin/cache/stats", tags=["admin"], summary="Embedding cache stats", description="Return query-embedding cache size and hit rate, plus semantic query cache counters. Requires admin authentication.")
+async def admin_cache_stats(
+    _admin = Depends(require_admin),
+    embedding_service = Depends(get_embedding_service),
+    semantic_cache = Depends(get_semantic_cache)
+):
+    """
+    Return query-embedding cache size and hit rate, plus semantic query cache counters. Requires admin authentication.
+    """
+    return {**embedding_service.stats(), **semantic_cache.stats()}
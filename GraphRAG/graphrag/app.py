@@ -1,26 +1,28 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from .api.routes import router
-from .db.vector_db import QdrantWrapper
-from .config import get_settings
+from .api.dependencies import graphrag_lifespan
 
-app = FastAPI(title="GraphRAG API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with graphrag_lifespan(app):
+        # Initialize vector database collection on startup; keep existing data
+        try:
+            if not app.state.vector_db.client.collection_exists("documents"):
+                app.state.vector_db.create_collection(
+                    collection_name="documents",
+                    vector_size=384  # Size for all-MiniLM-L6-v2 model
+                )
+        except Exception as e:
+            print(f"Warning: Could not create documents collection: {str(e)}")
+        yield
 
-# Initialize vector database collection on startup
-@app.on_event("startup")
-async def startup_event():
-    settings = get_settings()
-    vector_db = QdrantWrapper()
-    try:
-        vector_db.create_collection(
-            collection_name="documents",
-            vector_size=384  # Size for all-MiniLM-L6-v2 model
-        )
-    except Exception as e:
-        print(f"Warning: Collection might already exist: {str(e)}")
+app = FastAPI(title="GraphRAG API", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Include API routes
 app.include_router(router, prefix="/api/v1")
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,3 @@
+"""
+Query result caching package.
+"""
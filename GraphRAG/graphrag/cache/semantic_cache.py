@@ -0,0 +1,144 @@
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import orjson
+
+from ..db.vector_db import _models
+
+log = logging.getLogger(__name__)
+
+class SemanticQueryCache:
+    """
+    Similarity-aware cache of query results backed by a dedicated Qdrant collection.
+    A query whose embedding is within `threshold` cosine similarity of a cached
+    query (and younger than `ttl` seconds) reuses that query's result.
+    The cache is best effort: Qdrant errors are logged and read as misses.
+    """
+
+    def __init__(
+        self,
+        vector_db,
+        collection_name: str = "query_cache",
+        vector_size: int = 384,
+        threshold: float = 0.92,
+        ttl: int = 7 * 24 * 3600
+    ):
+        self.vector_db = vector_db
+        self.collection_name = collection_name
+        self.vector_size = vector_size
+        self.threshold = threshold
+        self.ttl = ttl
+        self.hits_total = 0
+        self.misses_total = 0
+        self._stats_lock = threading.Lock()
+        self._ready = False
+        self._ensure_collection()
+
+    def _ensure_collection(self) -> bool:
+        """Create the collection if needed; retried on later calls while Qdrant is unreachable."""
+        if self._ready:
+            return True
+        try:
+            self._create_collection()
+        except Exception as e:
+            log.warning("Semantic cache unavailable: %s", e)
+            return False
+        self._ready = True
+        return True
+
+    def _create_collection(self) -> None:
+        models = _models()
+        client = self.vector_db.client
+        if not client.collection_exists(self.collection_name):
+            client.create_collection(
+                collection_name=self.collection_name,
+                vectors_config=models.VectorParams(size=self.vector_size, distance=models.Distance.COSINE)
+            )
+            client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name="ts",
+                field_schema=models.PayloadSchemaType.FLOAT
+            )
+
+    def get(self, query_vector: List[float]) -> Optional[Dict[str, Any]]:
+        """Return the cached result of the closest fresh query, or None on a miss."""
+        models = _models()
+        hit = answer = None
+        if self._ensure_collection():
+            try:
+                hits = self.vector_db.client.search(
+                    collection_name=self.collection_name,
+                    query_vector=query_vector,
+                    query_filter=models.Filter(must=[
+                        models.FieldCondition(key="ts", range=models.Range(gte=time.time() - self.ttl))
+                    ]),
+                    limit=1,
+                    with_payload=True,
+                    score_threshold=self.threshold
+                )
+                hit = hits[0] if hits else None
+                answer = orjson.loads(hit.payload["answer_json"]) if hit else None
+            except Exception as e:
+                log.warning("Semantic cache lookup failed, treating as a miss: %s", e)
+                answer = None
+        with self._stats_lock:
+            if answer is None:
+                self.misses_total += 1
+                return None
+            self.hits_total += 1
+        try:
+            self.vector_db.client.set_payload(
+                collection_name=self.collection_name,
+                payload={"hit_count": hit.payload.get("hit_count", 0) + 1},
+                points=[hit.id],
+                wait=False
+            )
+        except Exception as e:
+            log.warning("Semantic cache hit count update failed: %s", e)
+        return answer
+
+    def set(self, query_text: str, query_vector: List[float], answer: Dict[str, Any]) -> None:
+        """Store the result of a query under its embedding."""
+        models = _models()
+        if not self._ensure_collection():
+            return
+        point_id = str(uuid.uuid5(uuid.NAMESPACE_URL, query_text))
+        try:
+            self.vector_db.client.upsert(
+                collection_name=self.collection_name,
+                points=models.Batch(
+                    ids=[point_id],
+                    vectors=[np.asarray(query_vector, dtype=np.float32).tolist()],
+                    payloads=[{
+                        "answer_json": orjson.dumps(answer, default=str).decode("utf-8"),
+                        "ts": time.time(),
+                        "hit_count": 0
+                    }]
+                )
+            )
+        except Exception as e:
+            log.warning("Semantic cache store failed: %s", e)
+
+    def invalidate(self) -> None:
+        """Drop every cached answer written so far, e.g. after new documents are indexed."""
+        models = _models()
+        try:
+            self.vector_db.client.delete(
+                collection_name=self.collection_name,
+                points_selector=models.FilterSelector(filter=models.Filter(must=[
+                    models.FieldCondition(key="ts", range=models.Range(lte=time.time()))
+                ]))
+            )
+        except Exception as e:
+            log.warning("Semantic cache invalidation failed: %s", e)
+
+    def stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return {
+                "semcache_hits_total": self.hits_total,
+                "semcache_miss_total": self.misses_total
+            }
@@ -1,34 +1,50 @@
 from pydantic_settings import BaseSettings
 from pydantic import Field
-from functools import lru_cache
-from typing import List
+from typing import Final, List, Optional
 
 class Settings(BaseSettings):
     # Neo4j Configuration
     NEO4J_URI: str = Field(default="bolt://localhost:7687", alias="NEO4J_URI")
     NEO4J_USER: str = Field(default="neo4j", alias="NEO4J_USERNAME")
     NEO4J_PASSWORD: str = Field(default="password", alias="NEO4J_PASSWORD")
+    NEO4J_MAX_POOL_SIZE: int = Field(default=50, alias="NEO4J_MAX_POOL_SIZE")
+    NEO4J_ACQUISITION_TIMEOUT: float = Field(default=5.0, alias="NEO4J_ACQUISITION_TIMEOUT")
     
     # Qdrant Configuration
     QDRANT_URL: str = Field(default="http://localhost:6333", alias="QDRANT_URL")
     QDRANT_API_KEY: str = Field(default=None, alias="QDRANT_API_KEY")
+    QDRANT_PREFER_GRPC: bool = Field(default=True, alias="QDRANT_PREFER_GRPC")
+    QDRANT_GRPC_PORT: int = Field(default=6334, alias="QDRANT_GRPC_PORT")
     
     # Embedding Configuration
     EMBEDDING_MODEL: str = Field(default="sentence-transformers/all-MiniLM-L6-v2", alias="EMBEDDING_MODEL")
+    EMBEDDING_CACHE_SIZE: int = Field(default=4096, alias="EMBEDDING_CACHE_SIZE")
+    EMBEDDING_CACHE_TTL: int = Field(default=3600, alias="EMBEDDING_CACHE_TTL")
+    # "onnx" runs an int8-quantized ONNX export (needs optimum[onnxruntime]); default is sentence-transformers
+    EMBEDDING_BACKEND: str = Field(default="sentence-transformers", alias="EMBEDDING_BACKEND")
+    EMBEDDING_ONNX_DIR: str = Field(default=".onnx_models", alias="EMBEDDING_ONNX_DIR")
+    SEMANTIC_CACHE_THRESHOLD: float = Field(default=0.92, alias="SEMANTIC_CACHE_THRESHOLD")
+    SEMANTIC_CACHE_TTL: int = Field(default=7 * 24 * 3600, alias="SEMANTIC_CACHE_TTL")
 
     # Extra fields for compatibility with environment
     DEEPSEEK_API_KEY: str = Field(default=None, alias="DEEPSEEK_API_KEY")
 
+    # HMAC key for admin bearer tokens; admin routes are disabled when unset
+    ADMIN_TOKEN_SECRET: Optional[str] = Field(default=None, alias="ADMIN_TOKEN_SECRET")
+
     CORS_ORIGINS: List[str] = ["*"]  # Allow all origins by default for dev
 
     model_config = {
         "env_file": ".env",
-        "extra": "allow"
+        "extra": "allow",
+        "frozen": True
     }
 
-@lru_cache()
+# Built once at import; read-only for the life of the process
+SETTINGS: Final[Settings] = Settings()
+
 def get_settings() -> Settings:
-    return Settings()
+    return SETTINGS
 
 if __name__ == "__main__":
     print("[DEBUG] config.py __main__ block started.")
@@ -1,26 +1,172 @@
+import copy
+import functools
+import threading
+from contextlib import contextmanager
+from collections.abc import Hashable
+from typing import Iterable, List, Optional, Tuple
+from cachetools import TTLCache
 from neo4j import GraphDatabase
-from backend.GraphRAG.graphrag.config import get_settings
-from backend.GraphRAG.graphrag.db.graph_schema import NODE_TYPES, RELATIONSHIP_TYPES
+from backend.GraphRAG.graphrag.config import SETTINGS
+from backend.GraphRAG.graphrag.db.graph_schema import (
+    NODE_PROPERTIES, NODE_TYPES, RELATIONSHIP_TYPES, is_valid_edge, cypher_id_constraints, run_schema_statements
+)
+
+@functools.lru_cache(maxsize=512)
+def _build_match_query(label: Optional[str], keys: Tuple[str, ...], ret: str) -> str:
+    """
+    Build (once per label/keys/tail) a MATCH ... WHERE query over node properties.
+    Identical text across calls lets Neo4j reuse its cached query plan.
+    """
+    pattern = f"(n:{label})" if label else "(n)"
+    where = " AND ".join(f"n.{k} = ${k}" for k in keys)
+    return f"MATCH {pattern} WHERE {where} {ret}"
+
+@functools.lru_cache(maxsize=512)
+def _build_rel_match_query(from_label: str, rel_type: str, to_label: str,
+                           from_keys: Tuple[str, ...], to_keys: Tuple[str, ...], ret: str) -> str:
+    """Build (once per shape) a MATCH query for a relationship between two matched nodes."""
+    where = " AND ".join(
+        [f"a.{k} = $from_{k}" for k in from_keys] + [f"b.{k} = $to_{k}" for k in to_keys]
+    )
+    return f"MATCH (a:{from_label})-[r:{rel_type}]->(b:{to_label}) WHERE {where} {ret}"
+
+# Label-agnostic id lookup that still uses each label's id index
+_NODE_BY_ID_QUERY = (
+    "CALL { "
+    + " UNION ".join(f"MATCH (n:{label} {{id: $id}}) RETURN n" for label in NODE_TYPES)
+    + " } RETURN n LIMIT 1"
+)
+
+# Each path contributes one row per relationship; nodes and relationships are
+# aggregated independently so no nodes x relationships cross product is built.
+_TRAVERSE_QUERY_TEMPLATE = """
+MATCH (start)
+WHERE start.id IN $node_ids
+MATCH p = (start)-[*1..{max_hops}]-(n)
+UNWIND relationships(p) AS r
+WITH collect(DISTINCT start) + collect(DISTINCT n) AS ns, collect(DISTINCT r) AS rels
+UNWIND ns AS node
+RETURN collect(DISTINCT node) AS nodes, rels AS relationships
+"""
+
+_TRAVERSE_APOC_QUERY = """
+MATCH (start)
+WHERE start.id IN $node_ids
+CALL apoc.path.subgraphAll(start, {maxLevel: $max_hops}) YIELD nodes, relationships
+WITH collect(nodes) AS node_lists, collect(relationships) AS rel_lists
+RETURN apoc.coll.toSet(apoc.coll.flatten(node_lists)) AS nodes,
+       apoc.coll.toSet(apoc.coll.flatten(rel_lists)) AS relationships
+"""
+
+# Short-lived id -> node cache for hot entity lookups
+NODE_CACHE_SIZE = 10_000
+NODE_CACHE_TTL = 30
+
+def _node_cache_key(label: Optional[str], match_props: dict):
+    """
+    Cache key for an id-only lookup, or None when the lookup isn't cacheable
+    (other match properties, or an unhashable id value).
+    """
+    if tuple(match_props) != ("id",) or not isinstance(match_props["id"], Hashable):
+        return None
+    return (label, match_props["id"])
 
 class Neo4jWrapper:
+    _bound_session = None
+    # Set on transaction() views: cache invalidations queued until commit
+    _pending_invalidations = None
+
     def __init__(self):
-        settings = get_settings()
         self.driver = GraphDatabase.driver(
-            settings.NEO4J_URI,
-            auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD)
+            SETTINGS.NEO4J_URI,
+            auth=(SETTINGS.NEO4J_USER, SETTINGS.NEO4J_PASSWORD),
+            max_connection_pool_size=SETTINGS.NEO4J_MAX_POOL_SIZE,
+            connection_acquisition_timeout=SETTINGS.NEO4J_ACQUISITION_TIMEOUT
         )
+        # Server capabilities probed once; shared with with_session() views
+        self._capabilities = {}
+        # Node lookup cache, also shared with with_session() views
+        self._node_cache = TTLCache(maxsize=NODE_CACHE_SIZE, ttl=NODE_CACHE_TTL)
+        self._node_cache_lock = threading.Lock()
     
     def close(self):
         self.driver.close()
-    
-    def create_node(self, label: str, properties: dict):
+
+    @contextmanager
+    def _session(self, session=None, **config):
+        """
+        Reuse the caller's session (e.g. one scoped to an HTTP request) when given,
+        otherwise open a short-lived one from the driver pool.
+        """
+        session = session or self._bound_session
+        if session is not None:
+            yield session
+        else:
+            with self.driver.session(**config) as s:
+                yield s
+
+    def with_session(self, session):
+        """
+        Return a view of this wrapper that shares the driver and runs every call on `session`.
+        """
+        bound = copy.copy(self)
+        bound._bound_session = session
+        return bound
+
+    @contextmanager
+    def transaction(self):
+        """
+        Yield a view of this wrapper whose calls all run in one explicit transaction,
+        committed when the block exits cleanly and rolled back otherwise. Node cache
+        invalidations wait until after the commit, so a concurrent read can't
+        re-cache a node's old value in between.
+        """
+        with self._session() as session:
+            with session.begin_transaction() as tx:
+                bound = self.with_session(tx)
+                bound._pending_invalidations = []
+                yield bound
+                tx.commit()
+        for method, args in bound._pending_invalidations:
+            getattr(self, method)(*args)
+
+    def _defer(self, method: str, *args) -> bool:
+        """Queue an invalidation on a transaction() view; True if it was queued"""
+        if self._pending_invalidations is None:
+            return False
+        self._pending_invalidations.append((method, args))
+        return True
+
+    def has_apoc(self, session=None) -> bool:
+        """
+        Whether the APOC path procedures are installed (checked once per driver).
+        """
+        if "apoc" not in self._capabilities:
+            try:
+                with self._session(session) as s:
+                    record = s.run(
+                        "SHOW PROCEDURES YIELD name WHERE name = 'apoc.path.subgraphAll' "
+                        "RETURN count(*) > 0 AS available"
+                    ).single()
+                    self._capabilities["apoc"] = bool(record and record["available"])
+            except Exception:
+                self._capabilities["apoc"] = False
+        return self._capabilities["apoc"]
+
+    def ensure_id_indexes(self):
+        """
+        Ensure every node label has a uniqueness constraint (and so an index) on id.
+        """
+        run_schema_statements(self.driver, cypher_id_constraints())
+
+    def create_node(self, label: str, properties: dict, session=None):
         # Validate node type and properties
         if label not in NODE_TYPES:
             raise ValueError(f"Unknown node type: {label}")
         for prop in properties:
-            if prop not in NODE_TYPES[label]:
+            if (label, prop) not in NODE_PROPERTIES:
                 raise ValueError(f"Invalid property '{prop}' for node type '{label}'")
-        with self.driver.session() as session:
+        with self._session(session) as session:
             query = (
                 f"CREATE (n:{label} $properties) "
                 "RETURN n"
@@ -28,7 +174,7 @@ class Neo4jWrapper:
             result = session.run(query, properties=properties)
             return result.single()
     
-    def merge_node(self, label: str, properties: dict):
+    def merge_node(self, label: str, properties: dict, session=None):
         """
         Create a node if it doesn't exist, or update it if it does.
         Uses the 'id' property as the unique identifier.
@@ -36,59 +182,147 @@ class Neo4jWrapper:
         if label not in NODE_TYPES:
             raise ValueError(f"Unknown node type: {label}")
         for prop in properties:
-            if prop not in NODE_TYPES[label]:
+            if (label, prop) not in NODE_PROPERTIES:
                 raise ValueError(f"Invalid property '{prop}' for node type '{label}'")
         
-        with self.driver.session() as session:
+        with self._session(session) as session:
             query = (
                 f"MERGE (n:{label} {{id: $id}}) "
-                "SET n += $properties "
+                "SET n += $properties, n.updated_at = datetime() "
                 "RETURN n"
             )
             result = session.run(query, id=properties['id'], properties=properties)
-            return result.single()
+            record = result.single()
+        self.invalidate_node(label, {"id": properties['id']})
+        return record
     
-    def node_exists(self, label: str, match_props: dict) -> bool:
+    def bulk_merge_nodes(self, label: str, rows: List[dict], batch_size: int = 1000, session=None) -> int:
+        """
+        Merge many nodes of one label by id, one UNWIND round-trip per batch_size rows.
+        Returns the number of rows written.
+        """
+        self.validate_node_rows(label, rows)
+        query = (
+            "UNWIND $rows AS r "
+            f"MERGE (n:{label} {{id: r.id}}) "
+            "SET n += r, n.updated_at = datetime()"
+        )
+        with self._session(session) as session:
+            for start in range(0, len(rows), batch_size):
+                session.run(query, rows=rows[start:start + batch_size]).consume()
+        for row in rows:
+            self.invalidate_node(label, {"id": row["id"]})
+        return len(rows)
+
+    @staticmethod
+    def validate_node_rows(label: str, rows: List[dict]):
+        """Raise ValueError unless label is a node type and every row property belongs to it"""
+        if label not in NODE_TYPES:
+            raise ValueError(f"Unknown node type: {label}")
+        for row in rows:
+            for prop in row:
+                if (label, prop) not in NODE_PROPERTIES:
+                    raise ValueError(f"Invalid property '{prop}' for node type '{label}'")
+
+    @staticmethod
+    def validate_edges(from_label: str, to_label: str, rel_type: str, edges: List[dict]):
+        """Raise ValueError unless rel_type fits the labels and every edge's props are allowed"""
+        if rel_type not in RELATIONSHIP_TYPES:
+            raise ValueError(f"Unknown relationship type: {rel_type}")
+        if not is_valid_edge(from_label, rel_type, to_label):
+            raise ValueError(f"Invalid source/target for relationship {rel_type}: {from_label} -> {to_label}")
+        allowed = RELATIONSHIP_TYPES[rel_type]["properties"]
+        for edge in edges:
+            for prop in edge.get("props") or {}:
+                if prop not in allowed:
+                    raise ValueError(f"Invalid property '{prop}' for relationship type '{rel_type}'")
+
+    def node_exists(self, label: str, match_props: dict, session=None) -> bool:
         """
         Check if a node exists with the given properties.
         """
-        with self.driver.session() as session:
-            query = (
-                f"MATCH (n:{label}) WHERE " +
-                " AND ".join([f"n.{k} = ${k}" for k in match_props.keys()]) +
-                " RETURN count(n) as count"
-            )
+        with self._session(session) as session:
+            query = _build_match_query(label, tuple(match_props), "RETURN count(n) as count")
             result = session.run(query, **match_props)
             return result.single()["count"] > 0
     
-    def get_node(self, label: str, match_props: dict):
+    def get_node(self, label: Optional[str], match_props: dict, session=None, nocache: bool = False):
         """
         Get a single node matching the given properties.
-        Returns None if no node is found.
+        With label=None and an id-only match, looks the node up across all labels.
+        Found nodes are cached for NODE_CACHE_TTL seconds; pass nocache=True to
+        read through to Neo4j. Returns None if no node is found.
         """
-        with self.driver.session() as session:
-            query = (
-                f"MATCH (n:{label}) WHERE " +
-                " AND ".join([f"n.{k} = ${k}" for k in match_props.keys()]) +
-                " RETURN n"
-            )
+        key = _node_cache_key(label, match_props)
+        if key is not None and not nocache:
+            with self._node_cache_lock:
+                node = self._node_cache.get(key)
+            if node is not None:
+                return node
+        with self._session(session) as session:
+            if label is None and tuple(match_props) == ("id",):
+                query = _NODE_BY_ID_QUERY
+            else:
+                query = _build_match_query(label, tuple(match_props), "RETURN n")
             result = session.run(query, **match_props)
             record = result.single()
-            return record["n"] if record else None
+            node = record["n"] if record else None
+        if key is not None and node is not None:
+            with self._node_cache_lock:
+                self._node_cache[key] = node
+        return node
+
+    def invalidate_node(self, label: Optional[str], match_props: dict):
+        """
+        Drop cached lookups for a node. Id matches also drop the label-less entry;
+        any other match clears the whole cache, since we can't tell which ids it hit.
+        """
+        if self._defer("invalidate_node", label, match_props):
+            return
+        key = _node_cache_key(label, match_props)
+        with self._node_cache_lock:
+            if key is not None:
+                self._node_cache.pop(key, None)
+                self._node_cache.pop((None, key[1]), None)
+            else:
+                self._node_cache.clear()
+
+    def invalidate_ids(self, node_ids: Iterable[str]):
+        """Drop cached lookups for these ids under every label"""
+        if self._defer("invalidate_ids", list(node_ids)):
+            return
+        with self._node_cache_lock:
+            for node_id in node_ids:
+                for label in (None, *NODE_TYPES):
+                    self._node_cache.pop((label, node_id), None)
+
+    def _after_write(self, summary, invalidates: Optional[Iterable[str]]):
+        # Raw Cypher may touch any node: drop just the ids the caller names,
+        # or the whole node cache when it names none
+        if not summary.counters.contains_updates:
+            return
+        if invalidates is None:
+            self.clear_node_cache()
+        else:
+            self.invalidate_ids(invalidates)
+
+    def clear_node_cache(self):
+        if self._defer("clear_node_cache"):
+            return
+        with self._node_cache_lock:
+            self._node_cache.clear()
 
     def create_relationship(self, from_label: str, to_label: str, rel_type: str, 
-                          from_props: dict, to_props: dict, rel_props: dict = None):
+                          from_props: dict, to_props: dict, rel_props: dict = None, session=None):
         # Validate relationship type and properties
         if rel_type not in RELATIONSHIP_TYPES:
             raise ValueError(f"Unknown relationship type: {rel_type}")
-        valid_sources = RELATIONSHIP_TYPES[rel_type]["valid_sources"]
-        valid_targets = RELATIONSHIP_TYPES[rel_type]["valid_targets"]
-        if from_label not in valid_sources or to_label not in valid_targets:
+        if not is_valid_edge(from_label, rel_type, to_label):
             raise ValueError(f"Invalid source/target for relationship {rel_type}: {from_label} -> {to_label}")
         for prop in (rel_props or {}):
             if prop not in RELATIONSHIP_TYPES[rel_type]["properties"]:
                 raise ValueError(f"Invalid property '{prop}' for relationship type '{rel_type}'")
-        with self.driver.session() as session:
+        with self._session(session) as session:
             query = (
                 f"MATCH (a:{from_label}), (b:{to_label}) "
                 "WHERE a.id = $from_id AND b.id = $to_id "
@@ -102,21 +336,19 @@ class Neo4jWrapper:
             return result.single()
 
     def merge_relationship(self, from_label: str, to_label: str, rel_type: str,
-                         from_props: dict, to_props: dict, rel_props: dict = None):
+                         from_props: dict, to_props: dict, rel_props: dict = None, session=None):
         """
         Create a relationship if it doesn't exist, or update it if it does.
         """
         if rel_type not in RELATIONSHIP_TYPES:
             raise ValueError(f"Unknown relationship type: {rel_type}")
-        valid_sources = RELATIONSHIP_TYPES[rel_type]["valid_sources"]
-        valid_targets = RELATIONSHIP_TYPES[rel_type]["valid_targets"]
-        if from_label not in valid_sources or to_label not in valid_targets:
+        if not is_valid_edge(from_label, rel_type, to_label):
             raise ValueError(f"Invalid source/target for relationship {rel_type}: {from_label} -> {to_label}")
         for prop in (rel_props or {}):
             if prop not in RELATIONSHIP_TYPES[rel_type]["properties"]:
                 raise ValueError(f"Invalid property '{prop}' for relationship type '{rel_type}'")
         
-        with self.driver.session() as session:
+        with self._session(session) as session:
             query = (
                 f"MATCH (a:{from_label}), (b:{to_label}) "
                 "WHERE a.id = $from_id AND b.id = $to_id "
@@ -130,75 +362,93 @@ class Neo4jWrapper:
                                rel_props=rel_props or {})
             return result.single()
 
-    def update_node(self, label: str, match_props: dict, update_props: dict):
-        with self.driver.session() as session:
-            set_clause = ", ".join([f"n.{k} = $update_{k}" for k in update_props.keys()])
-            query = (
-                f"MATCH (n:{label}) WHERE " +
-                " AND ".join([f"n.{k} = ${k}" for k in match_props.keys()]) +
-                f" SET {set_clause} RETURN n"
-            )
+    def bulk_merge_relationships(self, from_label: str, to_label: str, rel_type: str,
+                                 edges: List[dict], batch_size: int = 1000, session=None) -> int:
+        """
+        Merge many relationships of one type in UNWIND batches.
+        Each edge is {"src": from_id, "dst": to_id, "props": {...}}.
+        Returns the number of edges written.
+        """
+        self.validate_edges(from_label, to_label, rel_type, edges)
+        rows = [{"src": edge["src"], "dst": edge["dst"], "props": edge.get("props") or {}} for edge in edges]
+        query = (
+            "UNWIND $edges AS e "
+            f"MATCH (a:{from_label} {{id: e.src}}), (b:{to_label} {{id: e.dst}}) "
+            f"MERGE (a)-[r:{rel_type}]->(b) "
+            "SET r += e.props"
+        )
+        with self._session(session) as session:
+            for start in range(0, len(rows), batch_size):
+                session.run(query, edges=rows[start:start + batch_size]).consume()
+        return len(rows)
+
+    def update_node(self, label: str, match_props: dict, update_props: dict, session=None):
+        with self._session(session) as session:
+            set_clause = ", ".join([f"n.{k} = $update_{k}" for k in update_props.keys()] + ["n.updated_at = datetime()"])
+            query = _build_match_query(label, tuple(match_props), f"SET {set_clause} RETURN n")
             params = {**match_props, **{f"update_{k}": v for k, v in update_props.items()}}
             result = session.run(query, **params)
-            return [record["n"] for record in result]
+            nodes = [record["n"] for record in result]
+        self.invalidate_node(label, match_props)
+        return nodes
 
-    def delete_node(self, label: str, match_props: dict):
-        with self.driver.session() as session:
-            query = (
-                f"MATCH (n:{label}) WHERE " +
-                " AND ".join([f"n.{k} = ${k}" for k in match_props.keys()]) +
-                " DETACH DELETE n"
-            )
+    def delete_node(self, label: str, match_props: dict, session=None):
+        with self._session(session) as session:
+            query = _build_match_query(label, tuple(match_props), "DETACH DELETE n")
             session.run(query, **match_props)
+        self.invalidate_node(label, match_props)
 
-    def get_relationship(self, from_label: str, to_label: str, rel_type: str, from_props: dict, to_props: dict):
-        with self.driver.session() as session:
-            query = (
-                f"MATCH (a:{from_label})-[r:{rel_type}]->(b:{to_label}) "
-                "WHERE "
-                + " AND ".join([f"a.{k} = $from_{k}" for k in from_props.keys()])
-                + " AND "
-                + " AND ".join([f"b.{k} = $to_{k}" for k in to_props.keys()])
-                + " RETURN r"
+    def get_relationship(self, from_label: str, to_label: str, rel_type: str, from_props: dict, to_props: dict, session=None):
+        with self._session(session) as session:
+            query = _build_rel_match_query(
+                from_label, rel_type, to_label, tuple(from_props), tuple(to_props), "RETURN r"
             )
             params = {**{f"from_{k}": v for k, v in from_props.items()}, **{f"to_{k}": v for k, v in to_props.items()}}
             result = session.run(query, **params)
             return [record["r"] for record in result]
 
-    def delete_relationship(self, from_label: str, to_label: str, rel_type: str, from_props: dict, to_props: dict):
-        with self.driver.session() as session:
-            query = (
-                f"MATCH (a:{from_label})-[r:{rel_type}]->(b:{to_label}) "
-                "WHERE "
-                + " AND ".join([f"a.{k} = $from_{k}" for k in from_props.keys()])
-                + " AND "
-                + " AND ".join([f"b.{k} = $to_{k}" for k in to_props.keys()])
-                + " DELETE r"
+    def delete_relationship(self, from_label: str, to_label: str, rel_type: str, from_props: dict, to_props: dict, session=None):
+        with self._session(session) as session:
+            query = _build_rel_match_query(
+                from_label, rel_type, to_label, tuple(from_props), tuple(to_props), "DELETE r"
             )
             params = {**{f"from_{k}": v for k, v in from_props.items()}, **{f"to_{k}": v for k, v in to_props.items()}}
             session.run(query, **params)
 
-    def run_query(self, query: str, parameters: dict = None):
-        with self.driver.session() as session:
+    def run_query(self, query: str, parameters: dict = None, session=None,
+                  invalidates: Optional[Iterable[str]] = None):
+        """
+        Run a Cypher query and return its records. If it wrote anything, cached
+        node lookups are dropped: only the `invalidates` ids when given, else all.
+        """
+        with self._session(session) as session:
             result = session.run(query, parameters or {})
-            return [record for record in result]
+            records = [record for record in result]
+            self._after_write(result.consume(), invalidates)
+            return records
 
-    def traverse_from_nodes(self, node_ids: list, max_hops: int = 2) -> dict:
+    def iter_query(self, query: str, parameters: dict = None, fetch_size: int = 500, session=None,
+                   invalidates: Optional[Iterable[str]] = None):
+        """
+        Stream records for a query, pulling them from the server fetch_size at a time
+        instead of materializing the full result list. Writes invalidate as in run_query.
+        """
+        with self._session(session, fetch_size=fetch_size) as s:
+            result = s.run(query, parameters or {})
+            for record in result:
+                yield record
+            self._after_write(result.consume(), invalidates)
+
+    def traverse_from_nodes(self, node_ids: list, max_hops: int = 2, session=None) -> dict:
         """
         Traverse the graph from the given node IDs up to max_hops, returning a subgraph (nodes, relationships, paths).
         """
-        with self.driver.session() as session:
-            query = f'''
-            MATCH (start)
-            WHERE start.id IN $node_ids
-            MATCH p = (start)-[*1..{max_hops}]-(n)
-            WITH collect(DISTINCT n) + collect(DISTINCT start) AS ns, collect(DISTINCT relationships(p)) AS rels
-            UNWIND ns AS node
-            UNWIND rels AS rel_list
-            UNWIND rel_list AS rel
-            RETURN collect(DISTINCT node) AS nodes, collect(DISTINCT rel) AS relationships
-            '''
-            result = session.run(query, {"node_ids": node_ids})
+        with self._session(session) as session:
+            if self.has_apoc(session=session):
+                query = _TRAVERSE_APOC_QUERY
+            else:
+                query = _TRAVERSE_QUERY_TEMPLATE.format(max_hops=int(max_hops))
+            result = session.run(query, {"node_ids": node_ids, "max_hops": max_hops})
             record = result.single()
             nodes = record["nodes"] if record and "nodes" in record else []
             relationships = record["relationships"] if record and "relationships" in record else []
@@ -215,28 +465,28 @@ class Neo4jWrapper:
             ]
             return {"nodes": node_dicts, "relationships": rel_dicts}
 
-    def get_all_nodes(self) -> list:
+    def iter_all_nodes(self, fetch_size: int = 1000, session=None):
+        """
+        Stream all nodes from the database with their properties and labels,
+        one dictionary at a time.
+        """
+        for record in self.iter_query("MATCH (n) RETURN n", fetch_size=fetch_size, session=session):
+            node = record["n"]
+            yield {
+                "id": node.get("id"),
+                "labels": list(node.labels),
+                **dict(node)
+            }
+
+    def get_all_nodes(self, session=None) -> list:
         """
         Get all nodes from the database with their properties and labels.
+        Prefer iter_all_nodes for large graphs.
         
         Returns:
             List of dictionaries containing node data
         """
-        with self.driver.session() as session:
-            query = """
-            MATCH (n)
-            RETURN n
-            """
-            result = session.run(query)
-            nodes = []
-            for record in result:
-                node = record["n"]
-                nodes.append({
-                    "id": node.get("id"),
-                    "labels": list(node.labels),
-                    **dict(node)
-                })
-            return nodes
+        return list(self.iter_all_nodes(session=session))
 
 if __name__ == "__main__":
     print("Testing Neo4j connectivity...")
@@ -1,3 +1,20 @@
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # optional: NumPy reductions are used instead
+    njit = None
+
+try:
+    import ahocorasick
+except ImportError:  # optional: falls back to per-token lookup
+    ahocorasick = None
+
 # Node type definitions for universal GraphRAG schema
 # Each node type is a dict of property names and types (for documentation and validation)
 
@@ -139,20 +156,48 @@ NODE_TYPES = {
     }
 }
 
-def cypher_constraints_for_node_types(node_types=NODE_TYPES):
-    """
-    Generate Cypher statements for unique constraints and indexes for each node type.
-    """
+# Share one string object per label, property and type name across the schema
+NODE_TYPES = {
+    sys.intern(label): {sys.intern(prop): sys.intern(kind) for prop, kind in props.items()}
+    for label, props in NODE_TYPES.items()
+}
+
+def _id_constraint_cypher(label):
+    return f"CREATE CONSTRAINT IF NOT EXISTS FOR (n:{label}) REQUIRE n.id IS UNIQUE;"
+
+def _build_node_cypher(node_types):
     cypher = []
     for label, props in node_types.items():
         # Unique constraint on id
-        cypher.append(f"CREATE CONSTRAINT IF NOT EXISTS FOR (n:{label}) REQUIRE n.id IS UNIQUE;")
+        cypher.append(_id_constraint_cypher(label))
         # Indexes for key properties (except id)
         for prop in props:
             if prop != "id":
                 cypher.append(f"CREATE INDEX IF NOT EXISTS FOR (n:{label}) ON (n.{prop});")
     return cypher
 
+# Built once at import; the schema dicts are static
+_NODE_CYPHER = tuple(_build_node_cypher(NODE_TYPES))
+
+# Flat (label, property) pairs for O(1) property validation
+NODE_PROPERTIES = frozenset(
+    (label, prop) for label, props in NODE_TYPES.items() for prop in props
+)
+
+def cypher_id_constraints(node_types=NODE_TYPES):
+    """
+    Generate only the id uniqueness constraint (and so index) for each node type.
+    """
+    return tuple(_id_constraint_cypher(label) for label in node_types)
+
+def cypher_constraints_for_node_types(node_types=NODE_TYPES):
+    """
+    Generate Cypher statements for unique constraints and indexes for each node type.
+    """
+    if node_types is NODE_TYPES:
+        return _NODE_CYPHER
+    return tuple(_build_node_cypher(node_types))
+
 # Universal relationship types for any user context
 RELATIONSHIP_TYPES = {
     # User-centric relationships
@@ -287,6 +332,30 @@ RELATIONSHIP_TYPES = {
     }
 }
 
+# Share one string object per name and make the per-type sets O(1) to check
+RELATIONSHIP_TYPES = {
+    sys.intern(rel_type): {
+        "valid_sources": frozenset(sys.intern(s) for s in spec["valid_sources"]),
+        "valid_targets": frozenset(sys.intern(t) for t in spec["valid_targets"]),
+        "properties": frozenset(sys.intern(p) for p in spec["properties"])
+    }
+    for rel_type, spec in RELATIONSHIP_TYPES.items()
+}
+
+# Every allowed (source label, relationship type, target label) triple
+_REL_CONFORMANCE = frozenset(
+    (source, rel_type, target)
+    for rel_type, spec in RELATIONSHIP_TYPES.items()
+    for source in spec["valid_sources"]
+    for target in spec["valid_targets"]
+)
+
+def is_valid_edge(source_label: str, rel_type: str, target_label: str) -> bool:
+    """
+    Whether the schema allows rel_type from source_label to target_label.
+    """
+    return (source_label, rel_type, target_label) in _REL_CONFORMANCE
+
 # Key relationship indexes
 RELATIONSHIP_INDEXES = [
     {"rel_type": "USER_KNOWS", "property": "last_contact_date"},
@@ -306,10 +375,7 @@ RELATIONSHIP_INDEXES = [
     {"rel_type": "SAME_AS", "property": "match_confidence"}
 ]
 
-def cypher_indexes_for_relationships(rel_indexes=RELATIONSHIP_INDEXES):
-    """
-    Generate Cypher statements for relationship property indexes.
-    """
+def _build_relationship_cypher(rel_indexes):
     cypher = []
     for idx in rel_indexes:
         rel_type = idx["rel_type"]
@@ -317,20 +383,51 @@ def cypher_indexes_for_relationships(rel_indexes=RELATIONSHIP_INDEXES):
         cypher.append(f"CREATE INDEX IF NOT EXISTS FOR ()-[r:{rel_type}]-() ON (r.{prop});")
     return cypher
 
-def initialize_graph_schema(neo4j_wrapper):
+_REL_CYPHER = tuple(_build_relationship_cypher(RELATIONSHIP_INDEXES))
+# DDL grouped by label / relationship type; groups touch disjoint schema and can run concurrently
+_SCHEMA_GROUPS = tuple(
+    tuple(_build_node_cypher({label: props})) for label, props in NODE_TYPES.items()
+) + tuple(
+    tuple(_build_relationship_cypher([idx for idx in RELATIONSHIP_INDEXES if idx["rel_type"] == rel_type]))
+    for rel_type in dict.fromkeys(idx["rel_type"] for idx in RELATIONSHIP_INDEXES)
+)
+
+def cypher_indexes_for_relationships(rel_indexes=RELATIONSHIP_INDEXES):
     """
-    Initialize the Neo4j schema: create all node constraints, indexes, and relationship indexes.
-    Usage: from graph_schema import initialize_graph_schema; initialize_graph_schema(Neo4jWrapper())
+    Generate Cypher statements for relationship property indexes.
     """
-    node_cypher = cypher_constraints_for_node_types()
-    rel_cypher = cypher_indexes_for_relationships()
-    with neo4j_wrapper.driver.session() as session:
-        for stmt in node_cypher + rel_cypher:
+    if rel_indexes is RELATIONSHIP_INDEXES:
+        return _REL_CYPHER
+    return tuple(_build_relationship_cypher(rel_indexes))
+
+def run_schema_statements(driver, statements):
+    with driver.session() as session:
+        # One transaction per group: a single commit instead of a round-trip per statement
+        try:
+            with session.begin_transaction() as tx:
+                for stmt in statements:
+                    tx.run(stmt)
+                tx.commit()
+            return
+        except Exception as e:
+            print(f"Batched schema init failed, retrying statement by statement\n{e}")
+        for stmt in statements:
             try:
-                session.run(stmt)
+                # consume() so server errors are raised here, not when the session closes
+                session.run(stmt).consume()
             except Exception as e:
                 print(f"Schema init error for: {stmt}\n{e}")
 
+def initialize_graph_schema(neo4j_wrapper, max_workers: int = 8):
+    """
+    Initialize the Neo4j schema: create all node constraints, indexes, and relationship indexes.
+    Each label / relationship type is set up in its own session, max_workers at a time.
+    Usage: from graph_schema import initialize_graph_schema; initialize_graph_schema(Neo4jWrapper())
+    """
+    driver = neo4j_wrapper.driver
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(lambda statements: run_schema_statements(driver, statements), _SCHEMA_GROUPS))
+
 # --- Context Classification and Relationship Inference Utilities ---
 
 CONTEXT_TAGS = {
@@ -346,38 +443,136 @@ CONTEXT_TAGS = {
     "topics": ["project", "meeting", "deadline", "proposal", "payment", "invoice", "assignment", "paper", "application", "travel", "booking"]
 }
 
+# Every tag once. Tags contain no whitespace, so a tag occurring anywhere in the
+# message is always a substring of a single whitespace-separated token.
+_ALL_TAGS = tuple(dict.fromkeys(tag for tags in CONTEXT_TAGS.values() for tag in tags))
+
+def _build_tag_automaton():
+    """Aho-Corasick automaton over all tags"""
+    automaton = ahocorasick.Automaton()
+    for tag in _ALL_TAGS:
+        automaton.add_word(tag, tag)
+    automaton.make_automaton()
+    return automaton
+
+_TAG_AUTOMATON = _build_tag_automaton() if ahocorasick is not None else None
+
+# Email domain -> context tag for channel-based classification
+_DOMAIN_CONTEXT = {"university.edu": "academic"}
+_DOMAIN_RE = re.compile(r"@(" + "|".join(map(re.escape, _DOMAIN_CONTEXT)) + r")", re.IGNORECASE)
+
 def classify_communication_context(message_content, sender, recipients, channel):
     """
     Analyze message to determine appropriate context tags.
     Placeholder: Replace nlp_service.extract_key_phrases with your NLP pipeline.
     """
     # Placeholder: simple keyword matching
-    key_phrases = message_content.lower().split()
-    matched_tags = []
-    for phrase in key_phrases:
-        for context, tags in CONTEXT_TAGS.items():
-            for tag in tags:
-                if tag in phrase:
-                    matched_tags.append(tag)
+    # A tag matches when it is a substring of any token, e.g. "meetings" -> meeting
+    text = message_content.lower()
+    if _TAG_AUTOMATON is not None:
+        # Single O(len(message)) scan for every tag at once
+        matched_tags = {tag for _, tag in _TAG_AUTOMATON.iter(text)}
+    else:
+        matched_tags = {tag for tag in _ALL_TAGS if tag in text}
     # Add channel-based context
-    if "@university.edu" in sender or any("@university.edu" in r for r in recipients):
-        matched_tags.append("academic")
-    return list(set(matched_tags))
+    for address in (sender, *recipients):
+        match = _DOMAIN_RE.search(address)
+        if match:
+            matched_tags.add(_DOMAIN_CONTEXT[match.group(1).lower()])
+    return list(matched_tags)
+
+# Histories at least this long are aggregated with NumPy instead of a Python loop
+_NUMPY_HISTORY_THRESHOLD = 1000
+
+def _to_epoch(ts) -> float:
+    if isinstance(ts, datetime):
+        return ts.timestamp()
+    if isinstance(ts, str):
+        return datetime.fromisoformat(ts).timestamp()
+    return float(ts)
+
+def _aggregate_history(message_history):
+    """Single pass over the history: (frequency, first_contact, last_contact, sentiment_pattern, channels)"""
+    frequency = 0
+    first_contact = last_contact = None
+    sentiment_sum = 0.0
+    channel_set = set()
+    for msg in message_history:
+        frequency += 1
+        ts = msg["timestamp"]
+        if first_contact is None or ts < first_contact:
+            first_contact = ts
+        if last_contact is None or ts > last_contact:
+            last_contact = ts
+        sentiment_sum += msg.get("sentiment", 0)
+        channel_id = msg.get("channel_id")
+        if channel_id:
+            channel_set.add(channel_id)
+    return frequency, first_contact, last_contact, sentiment_sum / max(1, frequency), channel_set
 
-def infer_relationship_from_communication(user_id, person_id, message_history, context_tags, graph_db):
+def _aggregate_arrays(timestamps, sentiments):
+    """Fused first/last index and mean sentiment over staged arrays (JIT-compiled when numba is available)"""
+    n = timestamps.shape[0]
+    first_idx = 0
+    last_idx = 0
+    total = 0.0
+    for i in range(n):
+        if timestamps[i] < timestamps[first_idx]:
+            first_idx = i
+        if timestamps[i] > timestamps[last_idx]:
+            last_idx = i
+        total += sentiments[i]
+    return first_idx, last_idx, total / n if n else 0.0
+
+_aggregate_arrays_jit = njit(cache=True)(_aggregate_arrays) if njit is not None else None
+
+def _aggregate_history_numpy(message_history, timestamps=None, sentiments=None):
+    """
+    Vectorized _aggregate_history. timestamps (epoch seconds) and sentiments may be
+    passed pre-materialized; first/last contact keep the original timestamp values.
+    """
+    frequency = len(message_history)
+    if timestamps is None:
+        timestamps = np.fromiter(
+            (_to_epoch(msg["timestamp"]) for msg in message_history), dtype=np.float64, count=frequency
+        )
+    if sentiments is None:
+        sentiments = np.fromiter(
+            (msg.get("sentiment", 0) for msg in message_history), dtype=np.float64, count=frequency
+        )
+    if _aggregate_arrays_jit is not None:
+        first_idx, last_idx, sentiment_pattern = _aggregate_arrays_jit(
+            np.ascontiguousarray(timestamps, dtype=np.float64),
+            np.ascontiguousarray(sentiments, dtype=np.float64)
+        )
+    else:
+        first_idx, last_idx = timestamps.argmin(), timestamps.argmax()
+        sentiment_pattern = sentiments.mean(dtype=np.float64) if frequency else 0.0
+    first_contact = message_history[int(first_idx)]["timestamp"]
+    last_contact = message_history[int(last_idx)]["timestamp"]
+    sentiment_pattern = float(sentiment_pattern)
+    channel_set = {msg.get("channel_id") for msg in message_history}
+    channel_set.discard(None)
+    channel_set.discard("")
+    return frequency, first_contact, last_contact, sentiment_pattern, channel_set
+
+def infer_relationship_from_communication(user_id, person_id, message_history, context_tags, graph_db,
+                                          timestamps=None, sentiments=None):
     """
     Infer the nature of a relationship based on communication patterns and content.
     Placeholder: Replace analyze_message_timing and analyze_sentiment_pattern with your logic.
+    Large histories (or pre-built timestamps/sentiments arrays) take the NumPy path.
     """
-    from datetime import datetime
-    frequency = len(message_history)
-    last_contact = max(msg["timestamp"] for msg in message_history)
-    first_contact = min(msg["timestamp"] for msg in message_history)
-    # Placeholder: simple sentiment pattern
-    sentiment_pattern = sum(msg.get("sentiment", 0) for msg in message_history) / max(1, frequency)
+    if not message_history:
+        raise ValueError("message_history is empty")
+    if timestamps is not None or sentiments is not None or len(message_history) >= _NUMPY_HISTORY_THRESHOLD:
+        aggregates = _aggregate_history_numpy(message_history, timestamps, sentiments)
+    else:
+        aggregates = _aggregate_history(message_history)
+    frequency, first_contact, last_contact, sentiment_pattern, channel_set = aggregates
     # Placeholder: simple relationship strength
     strength = min(1.0, frequency / 100 + sentiment_pattern / 10)
-    channels = list(set(msg.get("channel_id") for msg in message_history if msg.get("channel_id")))
+    channels = list(channel_set)
     graph_db.create_relationship(
         from_label="User",
         to_label="Person",
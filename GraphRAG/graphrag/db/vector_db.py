@@ -1,7 +1,7 @@
-from qdrant_client import QdrantClient
-from qdrant_client.http import models
+import functools
+from typing import List, Dict, Any, Optional, Union
+import numpy as np
 from ..config import get_settings
-from typing import List, Dict, Any
 
 PERSON_VECTOR_SIZE = 768  # Adjust as needed
 ORG_VECTOR_SIZE = 768
@@ -9,178 +9,295 @@ MSG_VECTOR_SIZE = 768
 EVENT_VECTOR_SIZE = 768
 LOC_VECTOR_SIZE = 768
 
+# qdrant_client (and its grpc/protobuf stack) is only imported once a wrapper is used
+@functools.lru_cache(maxsize=None)
+def _models():
+    from qdrant_client.http import models
+    return models
+
+@functools.lru_cache(maxsize=None)
+def _int8_quantization():
+    # int8 scalar quantization: 4x smaller vectors kept in RAM, originals rescored from disk
+    models = _models()
+    return models.ScalarQuantization(
+        scalar=models.ScalarQuantizationConfig(
+            type=models.ScalarType.INT8,
+            quantile=0.99,
+            always_ram=True
+        )
+    )
+
+@functools.lru_cache(maxsize=None)
+def _binary_quantization():
+    # 1 bit per dimension (32x smaller than float32), compared with XOR + popcount;
+    # searches oversample and rescore against the originals to keep recall
+    models = _models()
+    return models.BinaryQuantization(
+        binary=models.BinaryQuantizationConfig(always_ram=True)
+    )
+
+@functools.lru_cache(maxsize=None)
+def _memmap_optimizers():
+    # Large TEXT payloads live on disk; segments past 20k vectors are memory-mapped
+    return _models().OptimizersConfigDiff(memmap_threshold=20000)
+
+@functools.lru_cache(maxsize=None)
+def _quantized_search_params():
+    models = _models()
+    return models.SearchParams(
+        quantization=models.QuantizationSearchParams(rescore=True, oversampling=2.0)
+    )
+
+Vector = Union[np.ndarray, List[float]]
+Vectors = Union[np.ndarray, List[List[float]]]
+
+def _as_float32(vectors) -> np.ndarray:
+    """Stage vector(s) as one contiguous float32 buffer (no-op for matching arrays)"""
+    return np.ascontiguousarray(vectors, dtype=np.float32)
+
+# Entity collections: name -> (vector size, indexed payload fields as PayloadSchemaType values)
+_COLLECTION_SPECS = {
+    "Person": (
+        PERSON_VECTOR_SIZE,
+        {
+            "id": "keyword",
+            "name": "text",
+            "email": "keyword",
+            "phone": "keyword",
+            "title": "text",
+            "organization_id": "keyword",
+            "first_contact_date": "datetime",
+            "last_contact_date": "datetime",
+            "source": "keyword",
+            "embedding_id": "keyword",
+        }
+    ),
+    "Organization": (
+        ORG_VECTOR_SIZE,
+        {
+            "id": "keyword",
+            "name": "text",
+            "type": "keyword",
+            "website": "keyword",
+            "description": "text",
+            "location": "text",
+            "embedding_id": "keyword",
+        }
+    ),
+    "Task": (
+        MSG_VECTOR_SIZE,
+        {
+            "id": "keyword",
+            "title": "text",
+            "status": "keyword",
+            "created_date": "datetime",
+            "source_type": "keyword",
+            "description": "text",
+            "priority": "keyword",
+            "due_date": "datetime",
+            "completion_date": "datetime",
+            "horizon": "keyword",
+            "recurrence": "keyword",
+            "estimated_time": "float",
+            "tags": "keyword",
+            "confidence_score": "float",
+            "assignee_id": "keyword",
+            "creator_id": "keyword",
+            "is_actionable": "bool",
+            "reminder_date": "datetime",
+            "embedding_id": "keyword",
+        }
+    ),
+    "Channel": (
+        MSG_VECTOR_SIZE,
+        {
+            "id": "keyword",
+            "name": "text",
+            "type": "keyword",
+            "provider": "keyword",
+            "is_connected": "bool",
+            "connection_status": "keyword",
+            "last_synced": "datetime",
+            "credentials_id": "keyword",
+            # "settings" is a nested object; Qdrant has no JSON index type, so it stays unindexed
+            "embedding_id": "keyword",
+        }
+    ),
+    "Thread": (
+        MSG_VECTOR_SIZE,
+        {
+            "id": "keyword",
+            "title": "text",
+            "status": "keyword",
+            "created_date": "datetime",
+            "last_updated": "datetime",
+            "channel_id": "keyword",
+            "external_id": "keyword",
+            "participants_count": "integer",
+            "message_count": "integer",
+            "embedding_id": "keyword",
+        }
+    ),
+    "Message": (
+        MSG_VECTOR_SIZE,
+        {
+            "id": "keyword",
+            "content": "text",
+            "sender_id": "keyword",
+            "channel_id": "keyword",
+            "thread_id": "keyword",
+            "timestamp": "datetime",
+            "read_status": "keyword",
+            "has_attachments": "bool",
+            "sentiment": "float",
+            "intent": "keyword",
+            "is_actionable": "bool",
+            "reply_to_id": "keyword",
+            "embedding_id": "keyword",
+        }
+    ),
+    "Event": (
+        EVENT_VECTOR_SIZE,
+        {
+            "id": "keyword",
+            "title": "text",
+            "description": "text",
+            "start_time": "datetime",
+            "end_time": "datetime",
+            "location": "text",
+            "embedding_id": "keyword",
+        }
+    ),
+    "Location": (
+        LOC_VECTOR_SIZE,
+        {
+            "id": "keyword",
+            "name": "text",
+            "address": "text",
+            "coordinates": "geo",
+            "type": "keyword",
+            "embedding_id": "keyword",
+        }
+    ),
+}
+
 class QdrantWrapper:
     def __init__(self):
+        from qdrant_client import QdrantClient
         settings = get_settings()
-        self.client = QdrantClient(url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY)
-
-    def create_person_collection(self):
-        self.client.recreate_collection(
-            collection_name="Person",
-            vectors_config=models.VectorParams(size=PERSON_VECTOR_SIZE, distance=models.Distance.COSINE),
-            payload_schema={
-                "id": models.PayloadSchemaType.KEYWORD,
-                "name": models.PayloadSchemaType.TEXT,
-                "email": models.PayloadSchemaType.KEYWORD,
-                "phone": models.PayloadSchemaType.KEYWORD,
-                "title": models.PayloadSchemaType.TEXT,
-                "organization_id": models.PayloadSchemaType.KEYWORD,
-                "first_contact_date": models.PayloadSchemaType.DATETIME,
-                "last_contact_date": models.PayloadSchemaType.DATETIME,
-                "source": models.PayloadSchemaType.KEYWORD,
-                "embedding_id": models.PayloadSchemaType.KEYWORD,
-            }
+        self.client = QdrantClient(
+            url=settings.QDRANT_URL,
+            api_key=settings.QDRANT_API_KEY,
+            prefer_grpc=settings.QDRANT_PREFER_GRPC,
+            grpc_port=settings.QDRANT_GRPC_PORT
         )
 
-    def create_organization_collection(self):
-        self.client.recreate_collection(
-            collection_name="Organization",
-            vectors_config=models.VectorParams(size=ORG_VECTOR_SIZE, distance=models.Distance.COSINE),
-            payload_schema={
-                "id": models.PayloadSchemaType.KEYWORD,
-                "name": models.PayloadSchemaType.TEXT,
-                "type": models.PayloadSchemaType.KEYWORD,
-                "website": models.PayloadSchemaType.KEYWORD,
-                "description": models.PayloadSchemaType.TEXT,
-                "location": models.PayloadSchemaType.TEXT,
-                "embedding_id": models.PayloadSchemaType.KEYWORD,
-            }
-        )
-    
-    def create_task_collection(self):
-        self.client.recreate_collection(
-            collection_name="Task",
-            vectors_config=models.VectorParams(size=MSG_VECTOR_SIZE, distance=models.Distance.COSINE),
-            payload_schema={
-                "id": models.PayloadSchemaType.KEYWORD,
-                "title": models.PayloadSchemaType.TEXT,
-                "status": models.PayloadSchemaType.KEYWORD,
-                "created_date": models.PayloadSchemaType.DATETIME,
-                "source_type": models.PayloadSchemaType.KEYWORD,
-                "description": models.PayloadSchemaType.TEXT,
-                "priority": models.PayloadSchemaType.KEYWORD,
-                "due_date": models.PayloadSchemaType.DATETIME,
-                "completion_date": models.PayloadSchemaType.DATETIME,
-                "horizon": models.PayloadSchemaType.KEYWORD,
-                "recurrence": models.PayloadSchemaType.KEYWORD,
-                "estimated_time": models.PayloadSchemaType.FLOAT,
-                "tags": models.PayloadSchemaType.KEYWORD,
-                "confidence_score": models.PayloadSchemaType.FLOAT,
-                "assignee_id": models.PayloadSchemaType.KEYWORD,
-                "creator_id": models.PayloadSchemaType.KEYWORD,
-                "is_actionable": models.PayloadSchemaType.BOOL,
-                "reminder_date": models.PayloadSchemaType.DATETIME,
-                "embedding_id": models.PayloadSchemaType.KEYWORD,
-            }
-        )
+    def close(self):
+        self.client.close()
 
-    def create_channel_collection(self):
-        self.client.recreate_collection(
-            collection_name="Channel",
-            vectors_config=models.VectorParams(size=MSG_VECTOR_SIZE, distance=models.Distance.COSINE),
-            payload_schema={
-                "id": models.PayloadSchemaType.KEYWORD,
-                "name": models.PayloadSchemaType.TEXT,
-                "type": models.PayloadSchemaType.KEYWORD,
-                "provider": models.PayloadSchemaType.KEYWORD,
-                "is_connected": models.PayloadSchemaType.BOOL,
-                "connection_status": models.PayloadSchemaType.KEYWORD,
-                "last_synced": models.PayloadSchemaType.DATETIME,
-                "credentials_id": models.PayloadSchemaType.KEYWORD,
-                "settings": models.PayloadSchemaType.JSON,
-                "embedding_id": models.PayloadSchemaType.KEYWORD,
-            }
+    def create_collection(self, collection_name: str, vector_size: int):
+        models = _models()
+        self.client.create_collection(
+            collection_name=collection_name,
+            vectors_config=models.VectorParams(size=vector_size, distance=models.Distance.COSINE),
+            quantization_config=_int8_quantization()
         )
 
-    def create_thread_collection(self):
-        self.client.recreate_collection(
-            collection_name="Thread",
-            vectors_config=models.VectorParams(size=MSG_VECTOR_SIZE, distance=models.Distance.COSINE),
-            payload_schema={
-                "id": models.PayloadSchemaType.KEYWORD,
-                "title": models.PayloadSchemaType.TEXT,
-                "status": models.PayloadSchemaType.KEYWORD,
-                "created_date": models.PayloadSchemaType.DATETIME,
-                "last_updated": models.PayloadSchemaType.DATETIME,
-                "channel_id": models.PayloadSchemaType.KEYWORD,
-                "external_id": models.PayloadSchemaType.KEYWORD,
-                "participants_count": models.PayloadSchemaType.INTEGER,
-                "message_count": models.PayloadSchemaType.INTEGER,
-                "embedding_id": models.PayloadSchemaType.KEYWORD,
-            }
-        )
+    def _ensure_collection(self, collection_name: str, vector_size: int,
+                           payload_schema: Dict[str, str]):
+        """
+        Create the collection only if it is missing, then make sure every payload
+        field is indexed (create_payload_index is idempotent). Entity collections
+        are binary-quantized; existing collections keep their quantization.
+        """
+        models = _models()
+        if not self.client.collection_exists(collection_name):
+            self.client.create_collection(
+                collection_name=collection_name,
+                vectors_config=models.VectorParams(size=vector_size, distance=models.Distance.COSINE),
+                on_disk_payload=True,
+                optimizers_config=_memmap_optimizers(),
+                quantization_config=_binary_quantization()
+            )
+        for field_name, field_schema in payload_schema.items():
+            self.client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field_name,
+                field_schema=models.PayloadSchemaType(field_schema)
+            )
 
-    def create_message_collection(self):
-        self.client.recreate_collection(
-            collection_name="Message",
-            vectors_config=models.VectorParams(size=MSG_VECTOR_SIZE, distance=models.Distance.COSINE),
-            payload_schema={
-                "id": models.PayloadSchemaType.KEYWORD,
-                "content": models.PayloadSchemaType.TEXT,
-                "sender_id": models.PayloadSchemaType.KEYWORD,
-                "channel_id": models.PayloadSchemaType.KEYWORD,
-                "thread_id": models.PayloadSchemaType.KEYWORD,
-                "timestamp": models.PayloadSchemaType.DATETIME,
-                "read_status": models.PayloadSchemaType.KEYWORD,
-                "has_attachments": models.PayloadSchemaType.BOOL,
-                "sentiment": models.PayloadSchemaType.FLOAT,
-                "intent": models.PayloadSchemaType.KEYWORD,
-                "is_actionable": models.PayloadSchemaType.BOOL,
-                "reply_to_id": models.PayloadSchemaType.KEYWORD,
-                "embedding_id": models.PayloadSchemaType.KEYWORD,
-            }
-        )
+    def create_entity_collection(self, collection_name: str):
+        vector_size, payload_schema = _COLLECTION_SPECS[collection_name]
+        self._ensure_collection(collection_name, vector_size, payload_schema)
 
-    def create_event_collection(self):
-        self.client.recreate_collection(
-            collection_name="Event",
-            vectors_config=models.VectorParams(size=EVENT_VECTOR_SIZE, distance=models.Distance.COSINE),
-            payload_schema={
-                "id": models.PayloadSchemaType.KEYWORD,
-                "title": models.PayloadSchemaType.TEXT,
-                "description": models.PayloadSchemaType.TEXT,
-                "start_time": models.PayloadSchemaType.DATETIME,
-                "end_time": models.PayloadSchemaType.DATETIME,
-                "location": models.PayloadSchemaType.TEXT,
-                "embedding_id": models.PayloadSchemaType.KEYWORD,
-            }
-        )
+    def create_all_collections(self):
+        for collection_name in _COLLECTION_SPECS:
+            self.create_entity_collection(collection_name)
 
-    def create_location_collection(self):
-        self.client.recreate_collection(
-            collection_name="Location",
-            vectors_config=models.VectorParams(size=LOC_VECTOR_SIZE, distance=models.Distance.COSINE),
-            payload_schema={
-                "id": models.PayloadSchemaType.KEYWORD,
-                "name": models.PayloadSchemaType.TEXT,
-                "address": models.PayloadSchemaType.TEXT,
-                "coordinates": models.PayloadSchemaType.GEO,
-                "type": models.PayloadSchemaType.KEYWORD,
-                "embedding_id": models.PayloadSchemaType.KEYWORD,
-            }
-        )
+    def upsert_embedding(self, collection: str, id: str, vector: Vector, payload: Dict[str, Any]):
+        self.upsert_embeddings(collection, [id], [vector], [payload])
 
-    def upsert_embedding(self, collection: str, id: str, vector: List[float], payload: Dict[str, Any]):
-        self.client.upsert(
-            collection_name=collection,
-            points=models.Batch(
-                ids=[id],
-                vectors=[vector],
-                payloads=[payload]
+    def upsert_embeddings(self, collection: str, ids: List[str], vectors: Vectors,
+                          payloads: List[Dict[str, Any]], batch_size: int = 1000):
+        """
+        Upsert many points, one request per batch_size points.
+        vectors may be an (N, dim) array; it is staged once as float32 and sliced per batch.
+        """
+        models = _models()
+        staged = _as_float32(vectors)
+        for start in range(0, len(ids), batch_size):
+            end = start + batch_size
+            self.client.upsert(
+                collection_name=collection,
+                points=models.Batch(
+                    ids=ids[start:end],
+                    vectors=staged[start:end].tolist(),
+                    payloads=payloads[start:end]
+                )
             )
-        )
 
-    def get_embedding(self, collection: str, id: str):
-        result = self.client.retrieve(collection_name=collection, ids=[id])
+    def get_embedding(self, collection: str, id: str, fields: Optional[List[str]] = None,
+                      with_vector: bool = False):
+        """
+        Retrieve a point. Only the listed payload fields are returned when fields is
+        given (fields=[] returns no payload); the vector only when with_vector is set.
+        """
+        result = self.client.retrieve(
+            collection_name=collection,
+            ids=[id],
+            with_payload=True if fields is None else (fields or False),
+            with_vectors=with_vector
+        )
         return result
     
-    def search_vectors(self, collection_name: str, query_vector: List[float], limit: int = 5):
+    def search_vectors(self, collection_name: str, query_vector: Vector, limit: int = 5):
         search_result = self.client.search(
             collection_name=collection_name,
-            query_vector=query_vector,
-            limit=limit
+            query_vector=_as_float32(query_vector),
+            limit=limit,
+            search_params=_quantized_search_params()
+        )
+        return search_result
+
+    def search_batch(self, collection_name: str, query_vectors: Vectors, limit: int = 5,
+                     with_payload=True):
+        """
+        Run several searches against one collection in a single request.
+        Returns one hit list per query vector, in order.
+        """
+        models = _models()
+        return self.client.search_batch(
+            collection_name=collection_name,
+            requests=[
+                models.SearchRequest(
+                    vector=vector.tolist(),
+                    limit=limit,
+                    with_payload=with_payload,
+                    params=_quantized_search_params()
+                )
+                for vector in _as_float32(query_vectors)
+            ]
         )
-        return search_result 
 
 if __name__ == "__main__":
     print("Testing Qdrant connectivity...")
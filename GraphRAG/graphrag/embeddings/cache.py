@@ -0,0 +1,118 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Union
+
+import numpy as np
+
+from .embedding import EmbeddingService
+
+class CachedEmbeddingService:
+    """
+    Process-wide LRU+TTL cache in front of an EmbeddingService, keyed by a digest
+    of model and text. Give the wrapped service cache_size=0 so vectors aren't
+    cached twice.
+    """
+
+    def __init__(
+        self,
+        service: EmbeddingService,
+        max_size: int = 4096,
+        ttl: int = 3600
+    ):
+        self._service = service
+        self.max_size = max_size
+        self.ttl = ttl
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def __getattr__(self, name):
+        # Everything not cached here (model, embedding_metadata, ...) goes to the wrapped service
+        return getattr(self._service, name)
+
+    def _key(self, text: str) -> bytes:
+        return hashlib.blake2b(f"{self._service.model_name}:{text}".encode("utf-8"), digest_size=16).digest()
+
+    def _get(self, key: bytes):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                value, expire = entry
+                if expire > time.time():
+                    self._cache.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._cache[key]
+            self._misses += 1
+            return None
+
+    def _set(self, key: bytes, value) -> None:
+        with self._lock:
+            self._cache[key] = (value, time.time() + self.ttl)
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+    async def embed(
+        self,
+        text: Union[str, List[str]]
+    ) -> np.ndarray:
+        """Cached equivalent of EmbeddingService.embed"""
+        is_single = isinstance(text, str)
+        texts = [text] if is_single else text
+        keys = [self._key(t) for t in texts]
+        results = [self._get(k) for k in keys]
+        missing = [i for i, r in enumerate(results) if r is None]
+        if missing:
+            embeddings = await self._service.embed([texts[i] for i in missing])
+            for i, embedding in zip(missing, embeddings):
+                self._set(keys[i], embedding)
+                results[i] = embedding
+        if is_single:
+            return results[0]
+        return np.stack(results) if results else np.empty((0, self._service.embedding_dim), dtype=np.float32)
+
+    def get_embedding(self, text: str) -> np.ndarray:
+        """Synchronous cached embedding for a single text"""
+        key = self._key(text)
+        embedding = self._get(key)
+        if embedding is None:
+            embedding = self._service._embed_batch([text])[0]
+            self._set(key, embedding)
+        return embedding
+
+    generate_embedding = get_embedding
+
+    def get_embeddings(self, texts: List[str]) -> np.ndarray:
+        """Synchronous cached embeddings for many texts; distinct misses share one model forward pass"""
+        keys = [self._key(t) for t in texts]
+        results = [self._get(k) for k in keys]
+        missing = {}
+        for i, result in enumerate(results):
+            if result is None:
+                missing.setdefault(keys[i], []).append(i)
+        if missing:
+            embeddings = self._service._embed_batch([texts[idx[0]] for idx in missing.values()])
+            for (key, idx), embedding in zip(missing.items(), embeddings):
+                self._set(key, embedding)
+                for i in idx:
+                    results[i] = embedding
+        return np.stack(results) if results else np.empty((0, self._service.embedding_dim), dtype=np.float32)
+
+    def stats(self) -> dict:
+        """Return cache size and hit rate"""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "size": len(self._cache),
+                "hit_rate": self._hits / total if total else 0.0
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self._hits = 0
+            self._misses = 0
@@ -1,11 +1,33 @@
+import hashlib
 import logging
+import os
 from typing import List, Dict, Any, Union, Optional
 import asyncio
-import hashlib
+import concurrent.futures
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    import simsimd
+except ImportError:  # optional: NumPy dot is used instead
+    simsimd = None
 
-from sentence_transformers import SentenceTransformer
 from ..config import get_settings
 
+# Upper bound on characters per token; text past token_limit * this can never reach the model
+_MAX_CHARS_PER_TOKEN = 8
+
+def _mean_pool_normalize(token_embeddings: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """Mask-aware mean pooling over tokens followed by L2 normalization"""
+    mask = attention_mask.astype(np.float32)
+    # One pass over the (B, T, H) tensor; the divisions are done in place on the (B, H) result
+    pooled = np.einsum("bth,bt->bh", token_embeddings, mask)
+    pooled /= np.maximum(mask.sum(axis=1, keepdims=True), 1e-9)
+    pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+    return pooled
+
 class EmbeddingService:
     """Service to generate vector embeddings from text (async, batch, normalized, versioned)"""
     
@@ -13,25 +35,43 @@ class EmbeddingService:
         self, 
         model_name: str = "all-MiniLM-L6-v2",
         cache_size: int = 1000,
-        embedding_dim: int = 384
+        embedding_dim: int = 384,
+        backend: Optional[str] = None,
+        max_seq_length: int = 128
     ):
         """
         Initialize the embedding service.
         
         Args:
             model_name: Name of the SentenceTransformers model to use
-            cache_size: Maximum number of embeddings to cache
+            cache_size: Maximum number of embeddings to cache (0 disables the cache,
+                e.g. when a CachedEmbeddingService in front of it does the caching)
             embedding_dim: Dimension of the embedding vectors
+            backend: "sentence-transformers" or "onnx" (defaults to EMBEDDING_BACKEND)
+            max_seq_length: Token limit used by the ONNX backend
         """
+        settings = get_settings()
         self.model_name = model_name
         self.embedding_dim = embedding_dim
         self.cache_size = cache_size
+        self.backend = backend or settings.EMBEDDING_BACKEND
+        self.max_seq_length = max_seq_length
+        self.onnx_dir = settings.EMBEDDING_ONNX_DIR
         
-        # Lazy-loaded model (initialized on first use)
+        # Lazy-loaded models (initialized on first use)
         self._model = None
+        self._onnx_model = None
+        self._tokenizer = None
         
-        # Simple in-memory cache
-        self._cache = {}
+        # In-memory LRU cache of float16 vectors (half the memory of float32; for
+        # normalized vectors the dot product keeps ~3 decimal digits, which leaves
+        # similarity rankings unchanged in practice)
+        self._cache = OrderedDict()
+        # The service may be shared by event loops running in several threads
+        self._cache_lock = threading.Lock()
+        # Misses currently being embedded, by cache key; concurrent callers await these.
+        # Thread-safe futures (guarded by _cache_lock), so callers on any event loop can wait
+        self._inflight: Dict[bytes, concurrent.futures.Future] = {}
         
         logging.info(f"Initialized embedding service with model: {model_name}")
     
@@ -39,10 +79,43 @@ class EmbeddingService:
     def model(self):
         """Lazy-load the model only when first needed"""
         if self._model is None:
+            # Imported here so importing this module never pulls in torch
+            from sentence_transformers import SentenceTransformer
             logging.info(f"Loading embedding model: {self.model_name}")
             self._model = SentenceTransformer(self.model_name)
         return self._model
     
+    @property
+    def onnx_model(self):
+        """Lazy-load (exporting and int8-quantizing on first run) the ONNX model"""
+        if self._onnx_model is None:
+            self._onnx_model = self._load_onnx_model()
+        return self._onnx_model
+
+    def _load_onnx_model(self):
+        from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        from transformers import AutoTokenizer
+
+        model_id = self.model_name if "/" in self.model_name else f"sentence-transformers/{self.model_name}"
+        save_dir = os.path.join(self.onnx_dir, model_id.replace("/", "__"))
+        quantized_file = "model_quantized.onnx"
+        if not os.path.exists(os.path.join(save_dir, quantized_file)):
+            logging.info(f"Exporting {model_id} to ONNX with dynamic int8 quantization")
+            exported = ORTModelForFeatureExtraction.from_pretrained(model_id, export=True)
+            exported.save_pretrained(save_dir)
+            AutoTokenizer.from_pretrained(model_id).save_pretrained(save_dir)
+            quantizer = ORTQuantizer.from_pretrained(exported)
+            quantizer.quantize(
+                save_dir=save_dir,
+                quantization_config=AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+            )
+        logging.info(f"Loading ONNX embedding model: {save_dir}")
+        self._tokenizer = AutoTokenizer.from_pretrained(save_dir)
+        return ORTModelForFeatureExtraction.from_pretrained(
+            save_dir, file_name=quantized_file, provider="CPUExecutionProvider"
+        )
+
     @property
     def model_version(self) -> str:
         """Return the model name and version info (if available)"""
@@ -62,15 +135,15 @@ class EmbeddingService:
             "embedding_dim": self.embedding_dim
         }
     
-    def _generate_cache_key(self, text: str) -> str:
+    def _generate_cache_key(self, text: str) -> bytes:
         """Generate a deterministic cache key for a text"""
-        # Use hash for efficient storage
-        return hashlib.md5(text.encode('utf-8')).hexdigest()
+        # A fixed-size digest, so cached documents aren't kept a second time as keys
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
     
     async def embed(
         self, 
         text: Union[str, List[str]]
-    ) -> Union[List[float], List[List[float]]]:
+    ) -> np.ndarray:
         """
         Generate normalized embeddings for text(s) (async, batch, cached).
         
@@ -78,22 +151,21 @@ class EmbeddingService:
             text: Single text or list of texts to embed
             
         Returns:
-            Vector embedding(s) as list of floats
+            A (dim,) float32 vector for a single text, an (N, dim) array for a list
         """
         # Determine if input is single text or batch
         is_single = isinstance(text, str)
         texts = [text] if is_single else text
         
         # Check cache for each text
-        results = []
+        results = [None] * len(texts)
         texts_to_embed = []
         text_indices = []
         
         for i, t in enumerate(texts):
-            cache_key = self._generate_cache_key(t)
-            if cache_key in self._cache:
-                # Use cached embedding
-                results.append(self._cache[cache_key])
+            cached = self._cache_get(self._generate_cache_key(t))
+            if cached is not None:
+                results[i] = cached
             else:
                 # Mark for embedding
                 texts_to_embed.append(t)
@@ -101,68 +173,154 @@ class EmbeddingService:
         
         # Generate embeddings for texts not in cache
         if texts_to_embed:
-            # Use asyncio to avoid blocking
-            loop = asyncio.get_event_loop()
-            embeddings = await loop.run_in_executor(
-                None,
-                self._embed_batch,
-                texts_to_embed
-            )
+            loop = asyncio.get_running_loop()
+            
+            # Texts another call is already embedding are awaited rather than recomputed
+            to_compute = []
+            compute_indices = []
+            owned = []
+            waiting = []
+            with self._cache_lock:
+                for i, t in zip(text_indices, texts_to_embed):
+                    cache_key = self._generate_cache_key(t)
+                    future = self._inflight.get(cache_key)
+                    if future is not None:
+                        waiting.append((i, future))
+                        continue
+                    future = concurrent.futures.Future()
+                    self._inflight[cache_key] = future
+                    owned.append((cache_key, future))
+                    to_compute.append(t)
+                    compute_indices.append(i)
             
-            # Update cache with new embeddings
-            for text, embedding in zip(texts_to_embed, embeddings):
-                cache_key = self._generate_cache_key(text)
-                self._cache[cache_key] = embedding
-                
-                # Simple cache size management (LRU not implemented here)
-                if len(self._cache) > self.cache_size:
-                    # Remove a random item (in production, use LRU)
-                    self._cache.pop(next(iter(self._cache)))
+            if to_compute:
+                try:
+                    # Use asyncio to avoid blocking
+                    embeddings = await loop.run_in_executor(
+                        None,
+                        self._embed_batch,
+                        to_compute
+                    )
+                    # Update cache, resolve waiters and insert new embeddings at correct positions
+                    for i, (cache_key, future), embedding in zip(compute_indices, owned, embeddings):
+                        self._cache_put(cache_key, embedding)
+                        future.set_result(embedding)
+                        results[i] = embedding
+                except BaseException as e:
+                    for _, future in owned:
+                        if future.done():
+                            continue
+                        if isinstance(e, asyncio.CancelledError):
+                            future.cancel()
+                        else:
+                            future.set_exception(e)
+                    raise
+                finally:
+                    with self._cache_lock:
+                        for cache_key, _ in owned:
+                            self._inflight.pop(cache_key, None)
             
-            # Insert new embeddings into results at correct positions
-            for i, embedding in zip(text_indices, embeddings):
-                # Extend results list if needed
-                while len(results) <= i:
-                    results.append(None)
-                results[i] = embedding
-        
-        # Return single embedding or list based on input type
-        return results[0] if is_single else results
+            for i, future in waiting:
+                # shield: a cancelled waiter must not cancel the shared computation
+                results[i] = await asyncio.shield(asyncio.wrap_future(future))
+        
+        # Return single embedding or stacked batch based on input type
+        if is_single:
+            return results[0]
+        return np.stack(results) if results else np.empty((0, self.embedding_dim), dtype=np.float32)
+    
+    def _cache_get(self, cache_key: bytes) -> Optional[np.ndarray]:
+        """Cached embedding (marked most recently used) or None"""
+        if self.cache_size <= 0:
+            return None
+        with self._cache_lock:
+            cached = self._cache.get(cache_key)
+            if cached is None:
+                return None
+            self._cache.move_to_end(cache_key)
+        return cached.astype(np.float32)
     
-    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
-        """Generate normalized embeddings for a batch of texts (synchronous)"""
+    def _cache_put(self, cache_key: bytes, embedding: np.ndarray):
+        """Cache an embedding, evicting the least recently used entry when full"""
+        if self.cache_size <= 0:
+            return
+        vector = embedding.astype(np.float16)
+        with self._cache_lock:
+            self._cache[cache_key] = vector
+            self._cache.move_to_end(cache_key)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+    
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        """Generate normalized embeddings for a batch of texts (synchronous), as an (N, dim) float32 array"""
         # Preprocess texts
         processed_texts = [self._preprocess_text(t) for t in texts]
         
-        # Generate embeddings
+        return self._encode(processed_texts)
+    
+    def _encode(self, processed_texts: List[str]) -> np.ndarray:
+        """Run the model on preprocessed texts; returns an (N, dim) float32 array"""
+        if self.backend == "onnx":
+            try:
+                return self._embed_batch_onnx(processed_texts)
+            except ImportError as e:
+                logging.warning(f"ONNX backend unavailable ({e}); falling back to sentence-transformers")
+                self.backend = "sentence-transformers"
+        # encode() sorts inputs by length before batching (less padding) and restores order
         embeddings = self.model.encode(
             processed_texts,
-            convert_to_tensor=False,  # Return as list
-            normalize_embeddings=True  # Always normalize for cosine similarity
+            batch_size=64,
+            convert_to_numpy=True,
+            normalize_embeddings=True,  # Always normalize for cosine similarity
+            show_progress_bar=False
         )
-        
-        # Convert to Python lists
-        return embeddings.tolist()
+        return np.ascontiguousarray(embeddings, dtype=np.float32)
+    
+    def _embed_batch_onnx(self, texts: List[str]) -> np.ndarray:
+        """Run the quantized ONNX model and pool its token outputs (384-D, same as sentence-transformers)"""
+        model = self.onnx_model
+        encoded = self._tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_seq_length,
+            return_tensors="np"
+        )
+        outputs = model(**encoded)
+        return _mean_pool_normalize(outputs.last_hidden_state, encoded["attention_mask"])
+    
+    @property
+    def token_limit(self) -> int:
+        """Tokens the active backend keeps per text (the tokenizer truncates the rest)"""
+        if self.backend == "onnx":
+            return self.max_seq_length
+        return self.model.max_seq_length or self.max_seq_length
     
     def _preprocess_text(self, text: str) -> str:
         """Preprocess text before embedding"""
         # Simple preprocessing
         processed = text.strip()
         
-        # Truncate very long texts (model has token limits)
-        if len(processed) > 10000:
-            processed = processed[:10000]
+        # Drop the tail the tokenizer would truncate anyway so it is never tokenized;
+        # the bound follows the model's token limit instead of a fixed character count
+        max_chars = self.token_limit * _MAX_CHARS_PER_TOKEN
+        if len(processed) > max_chars:
+            processed = processed[:max_chars]
             
         return processed
     
     def calculate_similarity(
         self, 
-        embedding1: List[float], 
-        embedding2: List[float]
+        embedding1: Union[List[float], np.ndarray], 
+        embedding2: Union[List[float], np.ndarray]
     ) -> float:
         """Calculate cosine similarity between two normalized embeddings"""
         # Since embeddings are normalized, dot product = cosine similarity
-        return sum(a * b for a, b in zip(embedding1, embedding2))
+        a = np.asarray(embedding1, dtype=np.float32)
+        b = np.asarray(embedding2, dtype=np.float32)
+        if simsimd is not None:
+            return float(simsimd.dot(a, b))
+        return float(np.dot(a, b))
     
     async def find_similar_texts(
         self,
@@ -181,28 +339,25 @@ class EmbeddingService:
         Returns:
             List of dicts with text and similarity score
         """
+        if not candidate_texts or top_k <= 0:
+            return []
+        
         # Get embeddings
         query_embedding = await self.embed(query_text)
         candidate_embeddings = await self.embed(candidate_texts)
         
-        # Calculate similarities
-        similarities = [
-            self.calculate_similarity(query_embedding, emb)
-            for emb in candidate_embeddings
-        ]
+        # All similarities in one matrix-vector product
+        similarities = candidate_embeddings @ query_embedding
         
-        # Sort by similarity (descending)
-        results = sorted(
-            [
-                {"text": text, "similarity": similarity}
-                for text, similarity in zip(candidate_texts, similarities)
-            ],
-            key=lambda x: x["similarity"],
-            reverse=True
-        )
+        # Select the top k without sorting everything, then order just those
+        k = min(top_k, len(similarities))
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
         
-        # Return top k
-        return results[:top_k]
+        return [
+            {"text": candidate_texts[i], "similarity": float(similarities[i])}
+            for i in top
+        ]
 
     # Deprecated: use async embed instead
     def generate_embedding(self, text: str) -> list:
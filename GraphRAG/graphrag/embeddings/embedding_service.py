@@ -1,9 +1,29 @@
+from typing import Optional
+
+import numpy as np
+
+from ..config import get_settings
+from .cache import CachedEmbeddingService
 from .embedding import EmbeddingService
 
-# Create a singleton instance
-_embedding_service = EmbeddingService()
+_embedding_service: Optional[CachedEmbeddingService] = None
+
+def get_service() -> CachedEmbeddingService:
+    """
+    Return the process-wide cached EmbeddingService, constructing it on first use
+    so importing this module stays cheap.
+    """
+    global _embedding_service
+    if _embedding_service is None:
+        settings = get_settings()
+        _embedding_service = CachedEmbeddingService(
+            EmbeddingService(cache_size=0),
+            max_size=settings.EMBEDDING_CACHE_SIZE,
+            ttl=settings.EMBEDDING_CACHE_TTL
+        )
+    return _embedding_service
 
-def get_embedding(text: str) -> list:
+def get_embedding(text: str) -> np.ndarray:
     """
     Get embedding for a single text using the singleton EmbeddingService instance.
     
@@ -11,7 +31,6 @@ def get_embedding(text: str) -> list:
         text: The text to generate embedding for
         
     Returns:
-        List of floats representing the embedding vector
+        (dim,) float32 array representing the embedding vector
     """
-    # Use the synchronous method since we're in a non-async context
-    return _embedding_service._embed_batch([text])[0] 
\ No newline at end of file
+    return get_service().get_embedding(text)
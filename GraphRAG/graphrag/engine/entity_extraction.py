@@ -1,10 +1,104 @@
 import re
+import threading
 import uuid
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
+import numpy as np
 import spacy
 
+try:
+    from numba import njit
+except ImportError:  # optional: NumPy index arithmetic is used instead
+    njit = None
+
+try:
+    import hyperscan
+except ImportError:  # optional: falls back to precompiled re patterns
+    hyperscan = None
+
+# Contact-info patterns scanned on top of spaCy NER
+_REGEX_TYPES = (
+    ("EMAIL", r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"),
+    ("PHONE", r"(\+\d{1,2}\s?)?(\(\d{3}\)|\d{3})[\s.-]?\d{3}[\s.-]?\d{4}"),
+    ("URL", r"https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+"),
+)
+_REGEX_COMPILED = tuple((label, re.compile(pattern)) for label, pattern in _REGEX_TYPES)
+
+def _build_hyperscan_db():
+    """All contact patterns in one Hyperscan database, scanned in a single pass"""
+    db = hyperscan.Database()
+    db.compile(
+        expressions=[pattern.encode() for _, pattern in _REGEX_TYPES],
+        ids=list(range(len(_REGEX_TYPES))),
+        elements=len(_REGEX_TYPES),
+        flags=[hyperscan.HS_FLAG_SOM_LEFTMOST] * len(_REGEX_TYPES)
+    )
+    return db
+
+_HS_DB = _build_hyperscan_db() if hyperscan is not None else None
+# A Hyperscan database has a single scratch space, so scans are serialized
+_HS_LOCK = threading.Lock()
+
+def _regex_spans(text: str) -> List[Tuple[str, int, int]]:
+    """
+    Return (label, start, end) for every contact-pattern match, leftmost-longest
+    and non-overlapping per pattern like re.finditer.
+    """
+    # Hyperscan reports byte offsets; they equal str offsets only for ASCII text
+    if _HS_DB is None or not text.isascii():
+        return [(label, m.start(), m.end()) for label, rx in _REGEX_COMPILED for m in rx.finditer(text)]
+    longest = {}
+
+    def on_match(pattern_id, start, end, flags, context):
+        key = (pattern_id, start)
+        if end > longest.get(key, -1):
+            longest[key] = end
+
+    with _HS_LOCK:
+        _HS_DB.scan(text.encode("ascii"), match_event_handler=on_match)
+    spans = []
+    last_end = {}
+    for (pattern_id, start), end in sorted(longest.items()):
+        if start < last_end.get(pattern_id, -1):
+            continue
+        last_end[pattern_id] = end
+        spans.append((_REGEX_TYPES[pattern_id][0], start, end))
+    return spans
+
+def _pair_indices(type_ids, valid):
+    """
+    (i, j) index arrays, i < j, for every entity pair whose (type_i, type_j)
+    is allowed by the boolean type matrix `valid`.
+    """
+    n = type_ids.shape[0]
+    total = n * (n - 1) // 2
+    i_idx = np.empty(total, dtype=np.int64)
+    j_idx = np.empty(total, dtype=np.int64)
+    count = 0
+    for i in range(n):
+        for j in range(i + 1, n):
+            if valid[type_ids[i], type_ids[j]]:
+                i_idx[count] = i
+                j_idx[count] = j
+                count += 1
+    return i_idx[:count], j_idx[:count]
+
+def _pair_indices_numpy(type_ids, valid):
+    i_idx, j_idx = np.triu_indices(type_ids.shape[0], 1)
+    keep = valid[type_ids[i_idx], type_ids[j_idx]]
+    return i_idx[keep], j_idx[keep]
+
+_pair_indices_fast = njit(cache=True)(_pair_indices) if njit is not None else _pair_indices_numpy
+
 class EntityExtractor:
+    # (source entity type, target entity type) -> relationship type
+    _REL_MAP: Dict[Tuple[str, str], str] = {
+        ("Person", "Organization"): "AFFILIATED_WITH",
+        ("Organization", "Person"): "HAS_MEMBER",
+        ("Person", "Location"): "LOCATED_AT",
+        ("Organization", "Location"): "LOCATED_AT"
+    }
+
     def __init__(self, nlp_model="en_core_web_md", confidence_threshold=0.7):
         self.nlp = spacy.load(nlp_model)
         self.confidence_threshold = confidence_threshold
@@ -14,6 +108,11 @@ class EntityExtractor:
             {"label": "URL", "pattern": r"https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+"}
         ]
         self._add_custom_patterns()
+        # Components the entity path doesn't need (NER + entity_ruler only)
+        self._entity_only_disable = [
+            name for name in ("parser", "tagger", "lemmatizer", "attribute_ruler")
+            if name in self.nlp.pipe_names
+        ]
         self.entity_type_mapping = {
             "PERSON": "Person",
             "ORG": "Organization",
@@ -28,6 +127,13 @@ class EntityExtractor:
             "MONEY": "FinancialInfo",
             "PRODUCT": "Product"
         }
+        # Entity types as small ints plus an allowed-pair matrix for relationship enumeration
+        entity_types = sorted(set(self.entity_type_mapping.values()))
+        self._type_ids = {t: i for i, t in enumerate(entity_types)}
+        self._valid_pairs = np.array([
+            [self._infer_relationship_type(a, b) is not None for b in entity_types]
+            for a in entity_types
+        ], dtype=np.bool_)
 
     def _add_custom_patterns(self):
         pattern_matcher = self.nlp.add_pipe("entity_ruler", before="ner")
@@ -37,8 +143,28 @@ class EntityExtractor:
                 "pattern": [{"TEXT": {"REGEX": pattern_def["pattern"]}}]
             }])
 
-    def extract_entities(self, text: str) -> List[Dict[str, Any]]:
+    def process(self, text: str) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Extract entities and relationships from one spaCy parse of the text.
+        """
         doc = self.nlp(text)
+        entities = self.extract_entities(text, doc=doc)
+        relationships = self.extract_relationships(text, entities, doc=doc)
+        return {"entities": entities, "relationships": relationships}
+
+    def extract_entities_batch(self, texts: List[str], batch_size: int = 64) -> List[List[Dict[str, Any]]]:
+        """
+        Extract entities from many texts with nlp.pipe, skipping unused pipeline components.
+        """
+        docs = self.nlp.pipe(texts, batch_size=batch_size, n_process=1, disable=self._entity_only_disable)
+        return [self.extract_entities(text, doc=doc) for text, doc in zip(texts, docs)]
+
+    def extract_entities(self, text: str, doc=None) -> List[Dict[str, Any]]:
+        if doc is None:
+            with self.nlp.select_pipes(disable=self._entity_only_disable):
+                doc = self.nlp(text)
+        # One timestamp for everything extracted from this text
+        now = datetime.now()
         entities = []
         for ent in doc.ents:
             entity_type = self.entity_type_mapping.get(ent.label_, "Unknown")
@@ -54,41 +180,38 @@ class EntityExtractor:
                 "end_char": ent.end_char,
                 "confidence": confidence,
                 "context": self._get_entity_context(text, ent),
-                "extracted_at": datetime.now()
+                "extracted_at": now
             }
             entities.append(entity)
         # --- Regex extraction for phone, email, url ---
-        regex_types = [
-            ("EMAIL", r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"),
-            ("PHONE", r"(\+\d{1,2}\s?)?(\(\d{3}\)|\d{3})[\s.-]?\d{3}[\s.-]?\d{4}"),
-            ("URL", r"https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+"),
-        ]
-        for label, pattern in regex_types:
-            for match in re.finditer(pattern, text):
-                # Check if already present
-                if any(e['start_char'] == match.start() and e['end_char'] == match.end() for e in entities):
-                    continue
-                entity = {
-                    "text": match.group(),
-                    "type": "ContactInfo",
-                    "start_char": match.start(),
-                    "end_char": match.end(),
-                    "confidence": 0.95,
-                    "context": self._get_entity_context(text, match),
-                    "extracted_at": datetime.now()
-                }
-                entities.append(entity)
+        seen = {(e["start_char"], e["end_char"]) for e in entities}
+        for label, start, end in _regex_spans(text):
+            # Check if already present
+            if (start, end) in seen:
+                continue
+            seen.add((start, end))
+            entity = {
+                "text": text[start:end],
+                "type": "ContactInfo",
+                "start_char": start,
+                "end_char": end,
+                "confidence": 0.95,
+                "context": self._context(text, start, end),
+                "extracted_at": now
+            }
+            entities.append(entity)
         deduplicated = self._deduplicate_entities(entities)
         return deduplicated
 
     def _get_entity_context(self, full_text: str, entity_span) -> str:
         # Accept both spaCy span and regex match
         if hasattr(entity_span, 'start_char') and hasattr(entity_span, 'end_char'):
-            start = max(0, entity_span.start_char - 50)
-            end = min(len(full_text), entity_span.end_char + 50)
-        else:
-            start = max(0, entity_span.start() - 50)
-            end = min(len(full_text), entity_span.end() + 50)
+            return self._context(full_text, entity_span.start_char, entity_span.end_char)
+        return self._context(full_text, entity_span.start(), entity_span.end())
+
+    def _context(self, full_text: str, span_start: int, span_end: int) -> str:
+        start = max(0, span_start - 50)
+        end = min(len(full_text), span_end + 50)
         context = full_text[start:end]
         if start > 0:
             context = "..." + context
@@ -97,57 +220,54 @@ class EntityExtractor:
         return context
 
     def _deduplicate_entities(self, entities: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        grouped = {}
+        # Keep the highest-confidence entity per (type, lowercased text) in one pass
+        best = {}
         for entity in entities:
-            key = f"{entity['type']}|{entity['text'].lower()}"
-            if key not in grouped:
-                grouped[key] = []
-            grouped[key].append(entity)
-        deduplicated = []
-        for entities_group in grouped.values():
-            entities_group.sort(key=lambda x: x["confidence"], reverse=True)
-            deduplicated.append(entities_group[0])
-        return deduplicated
+            key = (entity["type"], entity["text"].lower())
+            current = best.get(key)
+            if current is None or entity["confidence"] > current["confidence"]:
+                best[key] = entity
+        return list(best.values())
 
-    def extract_relationships(self, text: str, entities: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def extract_relationships(self, text: str, entities: List[Dict[str, Any]], doc=None) -> List[Dict[str, Any]]:
         relationships = []
-        entity_spans = {}
-        for entity in entities:
-            span_key = f"{entity['start_char']}:{entity['end_char']}"
-            entity_spans[span_key] = entity
-        doc = self.nlp(text)
-        for sent in doc.sents:
-            sent_entities = []
-            for ent in doc.ents:
-                if ent.start_char >= sent.start_char and ent.end_char <= sent.end_char:
-                    span_key = f"{ent.start_char}:{ent.end_char}"
-                    if span_key in entity_spans:
-                        sent_entities.append(entity_spans[span_key])
-            if len(sent_entities) >= 2:
-                for i in range(len(sent_entities)):
-                    for j in range(i+1, len(sent_entities)):
-                        entity1 = sent_entities[i]
-                        entity2 = sent_entities[j]
-                        if entity1["type"] == entity2["type"]:
-                            continue
-                        rel_type = self._infer_relationship_type(entity1["type"], entity2["type"])
-                        if rel_type:
-                            relationship = {
-                                "source_entity": entity1,
-                                "target_entity": entity2,
-                                "relationship_type": rel_type,
-                                "confidence": 0.6,
-                                "extracted_from": sent.text,
-                                "extracted_at": datetime.now()
-                            }
-                            relationships.append(relationship)
+        entity_spans = {(entity["start_char"], entity["end_char"]): entity for entity in entities}
+        if doc is None:
+            doc = self.nlp(text)
+        now = datetime.now()
+        # Extracted entities backed by a spaCy entity, in document order, as parallel arrays
+        ents = [entity for entity in (entity_spans.get((ent.start_char, ent.end_char)) for ent in doc.ents)
+                if entity is not None]
+        if len(ents) < 2:
+            return relationships
+        sents = list(doc.sents)
+        sent_starts = np.fromiter((sent.start_char for sent in sents), dtype=np.int64, count=len(sents))
+        sent_ends = np.fromiter((sent.end_char for sent in sents), dtype=np.int64, count=len(sents))
+        ent_starts = np.fromiter((e["start_char"] for e in ents), dtype=np.int64, count=len(ents))
+        ent_ends = np.fromiter((e["end_char"] for e in ents), dtype=np.int64, count=len(ents))
+        type_ids = np.fromiter((self._type_ids[e["type"]] for e in ents), dtype=np.int64, count=len(ents))
+        # Sentence containing each entity's start; entities crossing a sentence end are dropped
+        sent_idx = np.searchsorted(sent_starts, ent_starts, side="right") - 1
+        members = np.flatnonzero((sent_idx >= 0) & (ent_ends <= sent_ends[sent_idx]))
+        member_sents = sent_idx[members]
+        # Entities are sorted, so each sentence's members form one contiguous run
+        for group in np.split(members, np.flatnonzero(np.diff(member_sents)) + 1):
+            if len(group) < 2:
+                continue
+            sent = sents[sent_idx[group[0]]]
+            for i, j in zip(*_pair_indices_fast(type_ids[group], self._valid_pairs)):
+                entity1 = ents[group[i]]
+                entity2 = ents[group[j]]
+                relationship = {
+                    "source_entity": entity1,
+                    "target_entity": entity2,
+                    "relationship_type": self._infer_relationship_type(entity1["type"], entity2["type"]),
+                    "confidence": 0.6,
+                    "extracted_from": sent.text,
+                    "extracted_at": now
+                }
+                relationships.append(relationship)
         return relationships
 
     def _infer_relationship_type(self, source_type: str, target_type: str) -> Optional[str]:
-        relationship_mapping = {
-            ("Person", "Organization"): "AFFILIATED_WITH",
-            ("Organization", "Person"): "HAS_MEMBER",
-            ("Person", "Location"): "LOCATED_AT",
-            ("Organization", "Location"): "LOCATED_AT"
-        }
-        return relationship_mapping.get((source_type, target_type)) 
\ No newline at end of file
+        return self._REL_MAP.get((source_type, target_type)) 
\ No newline at end of file
@@ -1,9 +1,190 @@
 from typing import Dict, List, Any, Optional, Tuple
+import functools
+import re
 import uuid
+from collections import defaultdict
 from datetime import datetime
 import numpy as np
-from thefuzz import fuzz
-from thefuzz import process
+from rapidfuzz import fuzz, process, utils
+
+try:
+    from ciso8601 import parse_datetime as _fromisoformat
+except ImportError:  # optional: the stdlib parser is used instead
+    _fromisoformat = datetime.fromisoformat
+from ..config import SETTINGS
+from ..embeddings.cache import CachedEmbeddingService
+
+# Cypher templates; labels, property names and relationship types can't be parameters,
+# so they are formatted in by _cypher, which builds each distinct query text once
+_MATCH_BY_PROPERTY = """
+MATCH (e:{label})
+WHERE e.{prop} = $value
+RETURN e
+LIMIT 1
+"""
+
+_FUZZY_CANDIDATES = """
+MATCH (e:{label})
+RETURN e.id AS id, e.{prop} AS name
+LIMIT 100
+"""
+
+_MATCH_BY_ID = """
+MATCH (e:{label})
+WHERE e.id = $id
+RETURN e
+"""
+
+_MATCH_BY_RELATED = """
+MATCH (e:{label})-[]-(other)
+WHERE other.id IN $related_ids
+WITH e, count(other) AS shared_count
+WHERE shared_count >= 2
+RETURN e, shared_count
+ORDER BY shared_count DESC
+LIMIT 1
+"""
+
+_FETCH_PAIR = """
+MATCH (s:{label}), (t:{label})
+WHERE s.id = $source_id AND t.id = $target_id
+RETURN s, t
+"""
+
+# Update the target, mark the source merged and return the result in one statement
+_MERGE_PAIR = """
+MATCH (s:{label}), (t:{label})
+WHERE s.id = $source_id AND t.id = $target_id
+SET t += $properties, t.updated_at = datetime()
+SET s.merged = true,
+    s.merged_into = $target_id,
+    s.merged_at = $merged_at,
+    s.updated_at = datetime()
+RETURN t, t.updated_at.epochMillis AS version
+"""
+
+# Validate a vector-payload snapshot: e is only returned when the node changed
+# (updated_at moved past the snapshot's version), so a fresh hit costs no node transfer
+_SNAPSHOT_CHECK = """
+MATCH (e:{label})
+WHERE e.id = $id
+RETURN coalesce(e.merged, false) AS merged,
+       CASE WHEN e.updated_at.epochMillis = $version THEN null ELSE e END AS e
+"""
+
+_OUTGOING_RELS = """
+MATCH (source:{label})-[r]->(other)
+WHERE source.id = $source_id
+RETURN type(r) AS rel_type, properties(r) AS props, elementId(other) AS other_id
+"""
+
+_INCOMING_RELS = """
+MATCH (other)-[r]->(source:{label})
+WHERE source.id = $source_id
+RETURN type(r) AS rel_type, properties(r) AS props, elementId(other) AS other_id
+"""
+
+_TRANSFER_RELS = """
+MATCH (t:{label})
+WHERE t.id = $target_id
+UNWIND $batch AS b
+MATCH (o)
+WHERE elementId(o) = b.other_id
+MERGE {pattern}
+ON CREATE SET r = b.props
+"""
+
+_UNMERGED_WITH_NEIGHBOURS = """
+MATCH (e:{label})
+WHERE e.merged IS NULL OR e.merged = false
+WITH e
+LIMIT $limit
+OPTIONAL MATCH (e)-[]-(other)
+RETURN e, collect(other.id) AS related_ids
+"""
+
+# Properties compared by _calculate_property_similarity
+_IMPORTANT_PROPS = (
+    "email", "phone", "title", "role", "company",
+    "website", "address", "description"
+)
+
+_NON_DIGIT_RE = re.compile(r"\D")
+_URL_PREFIX_RE = re.compile(r"^(?:https?://)?(?:www\.)?")
+
+@functools.lru_cache(maxsize=4096)
+def _parse_iso(value: str) -> datetime:
+    """Parse an ISO-8601 timestamp; repeated strings (e.g. shared merged_at values) parse once"""
+    return _fromisoformat(value)
+
+# Merge strategies: (key, source value, target value) -> merged value, for keys on both entities
+def _newer_wins(key: str, source_value, target_value):
+    if key.endswith("_at") or key == "timestamp":
+        if source_value and target_value:
+            if isinstance(source_value, str):
+                source_value = _parse_iso(source_value)
+            if isinstance(target_value, str):
+                target_value = _parse_iso(target_value)
+            return source_value if source_value > target_value else target_value
+        return target_value
+    if key == "confidence":
+        return max(source_value, target_value)
+    if not target_value and source_value:
+        return source_value
+    return target_value
+
+def _source_wins(key: str, source_value, target_value):
+    return source_value
+
+def _target_wins(key: str, source_value, target_value):
+    return target_value
+
+_MERGE_STRATEGIES = {
+    "newer_wins": _newer_wins,
+    "source_wins": _source_wins,
+    "target_wins": _target_wins
+}
+
+def _popcount_rows(bits: np.ndarray) -> np.ndarray:
+    """Number of set bits in each row of a uint64 matrix"""
+    if hasattr(np, "bitwise_count"):  # NumPy 2: hardware popcount
+        return np.bitwise_count(bits).sum(axis=1, dtype=np.int64)
+    return np.unpackbits(bits.view(np.uint8), axis=1).sum(axis=1, dtype=np.int64)
+
+def _bitset_jaccard(neighbour_sets: List[set], idx1: np.ndarray, idx2: np.ndarray) -> np.ndarray:
+    """
+    Jaccard overlap of neighbour_sets[idx1[k]] and neighbour_sets[idx2[k]] for every k.
+    Each set is packed into a row of uint64 words (one bit per distinct neighbour id),
+    so intersection and union sizes are popcounts of AND / OR. 0 when either set is empty.
+    """
+    bit_of = {}
+    rows = []
+    cols = []
+    for row, neighbours in enumerate(neighbour_sets):
+        for neighbour in neighbours:
+            rows.append(row)
+            cols.append(bit_of.setdefault(neighbour, len(bit_of)))
+    words = max(1, (len(bit_of) + 63) // 64)
+    bits = np.zeros((len(neighbour_sets), words), dtype=np.uint64)
+    if cols:
+        cols = np.asarray(cols, dtype=np.uint64)
+        np.bitwise_or.at(
+            bits,
+            (np.asarray(rows, dtype=np.int64), (cols >> np.uint64(6)).astype(np.int64)),
+            np.left_shift(np.uint64(1), cols & np.uint64(63))
+        )
+    bits1 = bits[idx1]
+    bits2 = bits[idx2]
+    intersection = _popcount_rows(bits1 & bits2)
+    union = _popcount_rows(bits1 | bits2)
+    sizes = _popcount_rows(bits)
+    both = (sizes[idx1] > 0) & (sizes[idx2] > 0)
+    return np.divide(intersection, union, out=np.zeros(len(idx1)), where=both)
+
+@functools.lru_cache(maxsize=512)
+def _cypher(template: str, label: str, **fields) -> str:
+    """Format (once per template/label/fields) a query so identical text reuses Neo4j's plan cache"""
+    return template.format(label=label, **fields)
 
 class EntityResolutionEngine:
     def __init__(
@@ -19,6 +200,14 @@ class EntityResolutionEngine:
         """
         self.graph_db = graph_db
         self.vector_db = vector_db
+        # Merges and resolutions re-embed the same names repeatedly; always go through
+        # the content-hashed LRU (the API already passes a cached service)
+        if not isinstance(embedding_service, CachedEmbeddingService):
+            embedding_service = CachedEmbeddingService(
+                embedding_service,
+                max_size=SETTINGS.EMBEDDING_CACHE_SIZE,
+                ttl=SETTINGS.EMBEDDING_CACHE_TTL
+            )
         self.embedding_service = embedding_service
         self.similarity_threshold = similarity_threshold
         self.fuzzy_match_threshold = fuzzy_match_threshold
@@ -79,12 +268,7 @@ class EntityResolutionEngine:
         for property_name, value in identifiers:
             if not value:
                 continue
-            query = f"""
-            MATCH (e:{entity_type})
-            WHERE e.{property_name} = $value
-            RETURN e
-            LIMIT 1
-            """
+            query = _cypher(_MATCH_BY_PROPERTY, entity_type, prop=property_name)
             result = self.graph_db.run_query(query, {"value": value})
             if result and len(result) > 0:
                 return result[0]["e"]
@@ -102,38 +286,25 @@ class EntityResolutionEngine:
         if name_field not in entity_data:
             return None
         entity_name = entity_data[name_field]
-        query = f"""
-        MATCH (e:{entity_type})
-        RETURN e.id AS id, e.{name_field} AS name
-        LIMIT 100
-        """
+        query = _cypher(_FUZZY_CANDIDATES, entity_type, prop=name_field)
         candidates = self.graph_db.run_query(query)
         if not candidates:
             return None
-        candidate_names = [(c["id"], c["name"]) for c in candidates if c["name"]]
+        candidate_names = {c["id"]: c["name"] for c in candidates if c["name"]}
         if not candidate_names:
             return None
-        matches = process.extractBests(
+        # With a dict of choices the match carries its key: (name, score, id)
+        match = process.extractOne(
             entity_name,
-            [c[1] for c in candidate_names],
+            candidate_names,
             scorer=fuzz.token_sort_ratio,
-            score_cutoff=self.fuzzy_match_threshold,
-            limit=3
+            processor=utils.default_process,
+            score_cutoff=self.fuzzy_match_threshold
         )
-        if not matches:
+        if match is None:
             return None
-        best_match_name = matches[0][0]
-        for c_id, c_name in candidate_names:
-            if c_name == best_match_name:
-                best_match_id = c_id
-                break
-        else:
-            return None
-        entity_query = f"""
-        MATCH (e:{entity_type})
-        WHERE e.id = $id
-        RETURN e
-        """
+        best_match_id = match[2]
+        entity_query = _cypher(_MATCH_BY_ID, entity_type)
         entity_result = self.graph_db.run_query(entity_query, {"id": best_match_id})
         if entity_result and len(entity_result) > 0:
             return entity_result[0]["e"]
@@ -154,22 +325,23 @@ class EntityResolutionEngine:
         if "description" in entity_data:
             entity_text += " " + entity_data["description"]
         entity_embedding = self.embedding_service.get_embedding(entity_text)
-        search_results = self.vector_db.search(
+        search_results = self.vector_db.search_vectors(
             collection_name=entity_type,
             query_vector=entity_embedding,
             limit=5
         )
+        check_query = _cypher(_SNAPSHOT_CHECK, entity_type)
         for result in search_results:
-            if result["score"] >= self.similarity_threshold:
-                entity_id = result["payload"]["id"]
-                entity_query = f"""
-                MATCH (e:{entity_type})
-                WHERE e.id = $id
-                RETURN e
-                """
-                entity_result = self.graph_db.run_query(entity_query, {"id": entity_id})
-                if entity_result and len(entity_result) > 0:
-                    return entity_result[0]["e"]
+            if result.score >= self.similarity_threshold:
+                payload = result.payload or {}
+                # Points written by _update_entity_embedding carry a versioned snapshot of
+                # the entity; it is used only while the node is unchanged and not merged
+                snapshot = payload.get("entity")
+                version = payload.get("version") if snapshot is not None else None
+                entity_result = self.graph_db.run_query(check_query, {"id": payload["id"], "version": version})
+                if not entity_result or entity_result[0]["merged"]:
+                    continue
+                return entity_result[0]["e"] if entity_result[0]["e"] is not None else snapshot
         return None
 
     def _match_by_relationships(
@@ -188,15 +360,7 @@ class EntityResolutionEngine:
                 related_entities.append(rel["target_id"])
         if not related_entities:
             return None
-        query = f"""
-        MATCH (e:{entity_type})-[]-(other)
-        WHERE other.id IN $related_ids
-        WITH e, count(other) AS shared_count
-        WHERE shared_count >= 2
-        RETURN e, shared_count
-        ORDER BY shared_count DESC
-        LIMIT 1
-        """
+        query = _cypher(_MATCH_BY_RELATED, entity_type)
         result = self.graph_db.run_query(query, {"related_ids": related_entities})
         if result and len(result) > 0:
             return result[0]["e"]
@@ -212,59 +376,37 @@ class EntityResolutionEngine:
         """
         Merge two entities, preserving relationships and data
         """
-        source_query = f"""
-        MATCH (e:{entity_type})
-        WHERE e.id = $id
-        RETURN e
-        """
-        source_result = self.graph_db.run_query(source_query, {"id": source_id})
-        target_result = self.graph_db.run_query(source_query, {"id": target_id})
-        if not source_result or not target_result:
-            raise ValueError(f"One or both entities not found: {source_id}, {target_id}")
-        source_entity = source_result[0]["e"]
-        target_entity = target_result[0]["e"]
-        merged_properties = self._merge_properties(
-            source_entity, 
-            target_entity, 
-            merge_strategy
-        )
-        update_query = f"""
-        MATCH (e:{entity_type})
-        WHERE e.id = $id
-        SET e += $properties
-        RETURN e
-        """
-        updated_target = self.graph_db.run_query(
-            update_query, 
-            {
-                "id": target_id,
-                "properties": merged_properties
-            }
-        )
-        self._transfer_relationships(source_id, target_id, entity_type)
-        mark_merged_query = f"""
-        MATCH (e:{entity_type})
-        WHERE e.id = $id
-        SET e.merged = true, 
-            e.merged_into = $target_id,
-            e.merged_at = $merged_at
-        """
-        self.graph_db.run_query(
-            mark_merged_query, 
-            {
-                "id": source_id,
-                "target_id": target_id,
-                "merged_at": datetime.now().isoformat()
-            }
+        # Fetch, relationship transfer and merge commit together or not at all
+        with self.graph_db.transaction() as graph_db:
+            # Both entities in one round trip
+            fetch_result = graph_db.run_query(
+                _cypher(_FETCH_PAIR, entity_type),
+                {"source_id": source_id, "target_id": target_id}
+            )
+            if not fetch_result:
+                raise ValueError(f"One or both entities not found: {source_id}, {target_id}")
+            source_entity = fetch_result[0]["s"]
+            target_entity = fetch_result[0]["t"]
+            merged_properties = self._merge_properties(
+                source_entity, 
+                target_entity, 
+                merge_strategy
+            )
+            self._transfer_relationships(source_id, target_id, entity_type, graph_db=graph_db)
+            merged_result = graph_db.run_query(
+                _cypher(_MERGE_PAIR, entity_type),
+                {
+                    "source_id": source_id,
+                    "target_id": target_id,
+                    "properties": merged_properties,
+                    "merged_at": datetime.now().isoformat()
+                },
+                invalidates=(source_id, target_id)
+            )
+        self._update_entity_embedding(
+            target_id, entity_type, merged_properties, version=merged_result[0]["version"]
         )
-        self._update_entity_embedding(target_id, entity_type, merged_properties)
-        merged_query = f"""
-        MATCH (e:{entity_type})
-        WHERE e.id = $id
-        RETURN e
-        """
-        merged_result = self.graph_db.run_query(merged_query, {"id": target_id})
-        return merged_result[0]["e"]
+        return merged_result[0]["t"]
 
     def _merge_properties(
         self,
@@ -279,33 +421,15 @@ class EntityResolutionEngine:
         for key, value in target_entity.items():
             if key not in ["id", "labels"]:
                 merged[key] = value
+        # Resolve the strategy once; unknown strategies keep the target's values
+        resolve = _MERGE_STRATEGIES.get(merge_strategy, _target_wins)
         for key, value in source_entity.items():
             if key in ["id", "labels"]:
                 continue
             if key not in merged:
                 merged[key] = value
             else:
-                if merge_strategy == "newer_wins":
-                    if key.endswith("_at") or key == "timestamp":
-                        source_date = source_entity.get(key)
-                        target_date = merged.get(key)
-                        if source_date and target_date:
-                            if isinstance(source_date, str):
-                                source_date = datetime.fromisoformat(source_date)
-                            if isinstance(target_date, str):
-                                target_date = datetime.fromisoformat(target_date)
-                            merged[key] = source_date if source_date > target_date else target_date
-                        else:
-                            merged[key] = merged[key]
-                    elif key == "confidence":
-                        merged[key] = max(value, merged[key])
-                    else:
-                        if not merged[key] and value:
-                            merged[key] = value
-                elif merge_strategy == "source_wins":
-                    merged[key] = value
-                elif merge_strategy == "target_wins":
-                    pass
+                merged[key] = resolve(key, value, merged[key])
         merged["merged_count"] = (target_entity.get("merged_count", 0) or 0) + 1
         return merged
 
@@ -313,94 +437,45 @@ class EntityResolutionEngine:
         self,
         source_id: str,
         target_id: str,
-        entity_type: str
+        entity_type: str,
+        graph_db=None
     ) -> None:
         """
-        Transfer all relationships from source to target entity
-        """
-        outgoing_query = f"""
-        MATCH (source:{entity_type})-[r]->(target)
-        WHERE source.id = $source_id
-        RETURN type(r) AS rel_type, r AS rel, target
-        """
-        incoming_query = f"""
-        MATCH (source)-[r]->(target:{entity_type})
-        WHERE target.id = $source_id
-        RETURN type(r) AS rel_type, r AS rel, source
-        """
-        outgoing_rels = self.graph_db.run_query(outgoing_query, {"source_id": source_id})
-        incoming_rels = self.graph_db.run_query(incoming_query, {"source_id": source_id})
-        for rel in outgoing_rels:
-            rel_type = rel["rel_type"]
-            rel_props = {k: v for k, v in rel["rel"].items() if k not in ["id", "source", "target", "type"]}
-            target_node = rel["target"]
-            check_query = f"""
-            MATCH (source:{entity_type})-[r:{rel_type}]->(target)
-            WHERE source.id = $source_id AND target.id = $target_id
-            RETURN count(r) AS rel_count
-            """
-            check_result = self.graph_db.run_query(
-                check_query, 
-                {
-                    "source_id": target_id, 
-                    "target_id": target_node["id"]
-                }
-            )
-            rel_exists = check_result[0]["rel_count"] > 0
-            if not rel_exists:
-                create_query = f"""
-                MATCH (source:{entity_type}), (target)
-                WHERE source.id = $source_id AND target.id = $target_id
-                CREATE (source)-[r:{rel_type} $props]->(target)
-                """
-                self.graph_db.run_query(
-                    create_query, 
-                    {
-                        "source_id": target_id, 
-                        "target_id": target_node["id"],
-                        "props": rel_props
-                    }
-                )
-        for rel in incoming_rels:
-            rel_type = rel["rel_type"]
-            rel_props = {k: v for k, v in rel["rel"].items() if k not in ["id", "source", "target", "type"]}
-            source_node = rel["source"]
-            check_query = f"""
-            MATCH (source)-[r:{rel_type}]->(target:{entity_type})
-            WHERE source.id = $source_id AND target.id = $target_id
-            RETURN count(r) AS rel_count
-            """
-            check_result = self.graph_db.run_query(
-                check_query, 
-                {
-                    "source_id": source_node["id"], 
-                    "target_id": target_id
-                }
-            )
-            rel_exists = check_result[0]["rel_count"] > 0
-            if not rel_exists:
-                create_query = f"""
-                MATCH (source), (target:{entity_type})
-                WHERE source.id = $source_id AND target.id = $target_id
-                CREATE (source)-[r:{rel_type} $props]->(target)
-                """
-                self.graph_db.run_query(
-                    create_query, 
-                    {
-                        "source_id": source_node["id"], 
-                        "target_id": target_id,
-                        "props": rel_props
-                    }
+        Transfer all relationships from source to target entity, on graph_db
+        (e.g. a transaction view) when given.
+        Relationships are grouped by type (which Cypher can't parameterize) and each
+        group is written with one UNWIND ... MERGE, so existing ones aren't duplicated.
+        """
+        graph_db = graph_db or self.graph_db
+        directions = (
+            ("(t)-[r:`{rel_type}`]->(o)",
+             graph_db.run_query(_cypher(_OUTGOING_RELS, entity_type), {"source_id": source_id})),
+            ("(o)-[r:`{rel_type}`]->(t)",
+             graph_db.run_query(_cypher(_INCOMING_RELS, entity_type), {"source_id": source_id}))
+        )
+        for pattern, rels in directions:
+            batches = defaultdict(list)
+            for rel in rels:
+                batches[rel["rel_type"]].append({
+                    "other_id": rel["other_id"],
+                    "props": {k: v for k, v in rel["props"].items() if k not in ["id", "source", "target", "type"]}
+                })
+            for rel_type, batch in batches.items():
+                transfer_query = _cypher(_TRANSFER_RELS, entity_type, pattern=pattern.format(rel_type=rel_type))
+                graph_db.run_query(
+                    transfer_query, {"target_id": target_id, "batch": batch}, invalidates=(target_id,)
                 )
 
     def _update_entity_embedding(
         self,
         entity_id: str,
         entity_type: str,
-        entity_properties: Dict[str, Any]
+        entity_properties: Dict[str, Any],
+        version: Optional[int] = None
     ) -> None:
         """
-        Update entity embedding in the vector database
+        Update entity embedding in the vector database. `version` is the node's
+        updated_at (epoch millis) matching the stored snapshot.
         """
         text_to_embed = entity_properties.get("name", "") or entity_properties.get("text", "")
         if "description" in entity_properties:
@@ -415,21 +490,34 @@ class EntityResolutionEngine:
             payload={
                 "id": entity_id,
                 "text": text_to_embed[:100],
-                "type": entity_type
+                "type": entity_type,
+                # Snapshot returned by _match_by_embedding without a Cypher re-fetch
+                "entity": {**self._payload_snapshot(entity_properties), "id": entity_id},
+                "version": version
             }
         )
 
+    def _payload_snapshot(self, properties: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        JSON-compatible copy of node properties for a vector payload; temporal values
+        (Python or Neo4j) become ISO strings.
+        """
+        snapshot = {}
+        for key, value in properties.items():
+            if hasattr(value, "isoformat"):
+                value = value.isoformat()
+            elif hasattr(value, "iso_format"):
+                value = value.iso_format()
+            snapshot[key] = value
+        return snapshot
+
     def _normalize_phone(self, phone: str) -> str:
         """Normalize phone number by removing non-digits"""
-        return ''.join(c for c in phone if c.isdigit())
+        return _NON_DIGIT_RE.sub("", phone)
 
     def _normalize_url(self, url: str) -> str:
         """Normalize URL by removing http/https and trailing slashes"""
-        url = url.lower()
-        for prefix in ["https://", "http://", "www."]:
-            if url.startswith(prefix):
-                url = url[len(prefix):]
-        return url.rstrip("/")
+        return _URL_PREFIX_RE.sub("", url.lower(), count=1).rstrip("/")
 
     def _normalize_name(self, name: str) -> str:
         """Normalize personal name for matching"""
@@ -447,37 +535,126 @@ class EntityResolutionEngine:
         self,
         entity_type: str,
         match_threshold: float = 0.7,
-        limit: int = 1000
+        limit: int = 1000,
+        candidates_per_entity: int = 10
     ) -> List[Dict[str, Any]]:
         """
-        Run batch resolution on entities of a specific type
-        """
-        query = f"""
-        MATCH (e:{entity_type})
-        WHERE NOT exists(e.merged) OR e.merged = false
-        RETURN e
-        LIMIT $limit
-        """
-        entities = self.graph_db.run_query(query, {"limit": limit})
-        merge_candidates = []
+        Run batch resolution on entities of a specific type.
+        Candidate pairs come from one batched embedding pass and one batched
+        vector search instead of comparing every pair of entities.
+        """
+        query = _cypher(_UNMERGED_WITH_NEIGHBOURS, entity_type)
+        entities = {}
+        related = {}
+        for record in self.graph_db.iter_query(query, {"limit": limit}):
+            entity = dict(record["e"])
+            if entity.get("id"):
+                entities[entity["id"]] = entity
+                related[entity["id"]] = set(record["related_ids"])
+        if not entities:
+            return []
+        ids = list(entities)
+        texts = [entities[i].get("name") or entities[i].get("text") or "" for i in ids]
+        vectors = self.embedding_service.get_embeddings(texts)
+        search_results = self.vector_db.search_batch(
+            collection_name=entity_type,
+            query_vectors=vectors,
+            limit=candidates_per_entity + 1,
+            with_payload=["id"]
+        )
+        pairs = []
         processed_pairs = set()
-        for i, entity1 in enumerate(entities):
-            entity1_data = entity1["e"]
-            for j in range(i + 1, len(entities)):
-                entity2_data = entities[j]["e"]
-                pair_key = tuple(sorted([entity1_data["id"], entity2_data["id"]]))
+        for source_id, hits in zip(ids, search_results):
+            for hit in hits:
+                target_id = (hit.payload or {}).get("id")
+                if target_id == source_id or target_id not in entities:
+                    continue
+                # The same pair can come back from both ends (a finds b, b finds a)
+                pair_key = (source_id, target_id) if source_id < target_id else (target_id, source_id)
                 if pair_key in processed_pairs:
                     continue
                 processed_pairs.add(pair_key)
-                match_score = self._calculate_entity_similarity(entity1_data, entity2_data)
-                if match_score >= match_threshold:
-                    merge_candidates.append({
-                        "source_id": entity1_data["id"],
-                        "target_id": entity2_data["id"],
-                        "match_score": match_score,
-                        "entity_type": entity_type
-                    })
-        return merge_candidates
+                pairs.append((source_id, target_id))
+        if not pairs:
+            return []
+        scores = self._score_pairs(entities, related, pairs)
+        return [
+            {
+                "source_id": source_id,
+                "target_id": target_id,
+                "match_score": float(score),
+                "entity_type": entity_type
+            }
+            for (source_id, target_id), score in zip(pairs, scores)
+            if score >= match_threshold
+        ]
+
+    def _score_pairs(
+        self,
+        entities: Dict[str, Dict[str, Any]],
+        related: Dict[str, set],
+        pairs: List[Tuple[str, str]]
+    ) -> np.ndarray:
+        """
+        Bulk equivalent of _calculate_entity_similarity for many pairs: name scores
+        come from one rapidfuzz cpdist call and relationship overlap from neighbour
+        id sets fetched with the entities, so no per-pair queries are issued.
+        """
+        names1 = []
+        names2 = []
+        has_names = np.zeros(len(pairs), dtype=bool)
+        for k, (id1, id2) in enumerate(pairs):
+            entity1 = entities[id1]
+            entity2 = entities[id2]
+            text_field = "name" if "name" in entity1 else "text"
+            if text_field not in entity1 or text_field not in entity2:
+                names1.append("")
+                names2.append("")
+                continue
+            has_names[k] = True
+            names1.append(entity1[text_field])
+            names2.append(entity2[text_field])
+        position = {entity_id: k for k, entity_id in enumerate(entities)}
+        idx1 = np.fromiter((position[id1] for id1, _ in pairs), dtype=np.int64, count=len(pairs))
+        idx2 = np.fromiter((position[id2] for _, id2 in pairs), dtype=np.int64, count=len(pairs))
+        property_similarity = self._property_similarity_columns(list(entities.values()), idx1, idx2)
+        relationship_similarity = _bitset_jaccard([related[entity_id] for entity_id in entities], idx1, idx2)
+        name_similarity = process.cpdist(
+            names1,
+            names2,
+            scorer=fuzz.token_sort_ratio,
+            processor=utils.default_process,
+            workers=-1
+        ) / 100.0
+        combined = (
+            0.6 * name_similarity +
+            0.3 * relationship_similarity +
+            0.1 * property_similarity
+        )
+        # Same as _calculate_entity_similarity: no comparable name field means no match
+        return np.where(has_names, combined, 0.0)
+
+    def _property_similarity_columns(
+        self,
+        entities: List[Dict[str, Any]],
+        idx1: np.ndarray,
+        idx2: np.ndarray
+    ) -> np.ndarray:
+        """
+        _calculate_property_similarity for the pairs (entities[idx1[k]], entities[idx2[k]]),
+        computed one property column at a time instead of one pair at a time
+        """
+        matches = np.zeros(len(idx1))
+        total = np.zeros(len(idx1))
+        for prop in _IMPORTANT_PROPS:
+            column = np.empty(len(entities), dtype=object)
+            for k, entity in enumerate(entities):
+                column[k] = entity.get(prop)
+            present = np.fromiter((v is not None for v in column), dtype=bool, count=len(column))
+            truthy = np.fromiter((bool(v) for v in column), dtype=bool, count=len(column))
+            total += present[idx1] | present[idx2]
+            matches += truthy[idx1] & truthy[idx2] & (column[idx1] == column[idx2]).astype(bool)
+        return np.divide(matches, total, out=np.zeros_like(matches), where=total > 0)
 
     def _calculate_entity_similarity(
         self,
@@ -492,7 +669,7 @@ class EntityResolutionEngine:
             return 0.0
         text1 = entity1[text_field]
         text2 = entity2[text_field]
-        name_similarity = fuzz.token_sort_ratio(text1, text2) / 100.0
+        name_similarity = fuzz.token_sort_ratio(text1, text2, processor=utils.default_process) / 100.0
         relationship_similarity = self._calculate_relationship_overlap(
             entity1["id"], 
             entity2["id"]
@@ -512,24 +689,26 @@ class EntityResolutionEngine:
 
     def _calculate_relationship_overlap(self, entity1_id: str, entity2_id: str) -> float:
         """
-        Calculate relationship overlap between two entities
+        Calculate relationship overlap (Jaccard over neighbour ids) between two entities,
+        computed server-side in one query
         """
         query = """
-        MATCH (e)-[r]-(other)
-        WHERE e.id = $entity_id
-        RETURN other.id AS related_id
-        """
-        related1 = self.graph_db.run_query(query, {"entity_id": entity1_id})
-        related2 = self.graph_db.run_query(query, {"entity_id": entity2_id})
-        if not related1 or not related2:
+        OPTIONAL MATCH (a)-[]-(na)
+        WHERE a.id = $entity1_id
+        WITH collect(DISTINCT na.id) AS related1
+        OPTIONAL MATCH (b)-[]-(nb)
+        WHERE b.id = $entity2_id
+        WITH related1, collect(DISTINCT nb.id) AS related2
+        WITH related1, related2, size([x IN related1 WHERE x IN related2]) AS shared
+        RETURN CASE
+            WHEN size(related1) = 0 OR size(related2) = 0 THEN 0.0
+            ELSE toFloat(shared) / (size(related1) + size(related2) - shared)
+        END AS jaccard
+        """
+        result = self.graph_db.run_query(query, {"entity1_id": entity1_id, "entity2_id": entity2_id})
+        if not result:
             return 0.0
-        related_ids1 = set(item["related_id"] for item in related1)
-        related_ids2 = set(item["related_id"] for item in related2)
-        intersection = len(related_ids1.intersection(related_ids2))
-        union = len(related_ids1.union(related_ids2))
-        if union == 0:
-            return 0.0
-        return intersection / union
+        return result[0]["jaccard"]
 
     def _calculate_property_similarity(
         self,
@@ -539,13 +718,9 @@ class EntityResolutionEngine:
         """
         Calculate property similarity between two entities
         """
-        important_props = [
-            "email", "phone", "title", "role", "company", 
-            "website", "address", "description"
-        ]
         matches = 0
         total = 0
-        for prop in important_props:
+        for prop in _IMPORTANT_PROPS:
             val1 = entity1.get(prop)
             val2 = entity2.get(prop)
             if val1 is None and val2 is None:
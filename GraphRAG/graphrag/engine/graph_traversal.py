@@ -1,4 +1,40 @@
 from typing import List, Dict, Any, Optional
+from ..db.graph_schema import RELATIONSHIP_TYPES
+
+# Relationship types find_user_context prefers when linking an entity to the user
+_USER_CONTEXT_REL_FILTER = "|".join(
+    [rel_type for rel_type in RELATIONSHIP_TYPES if rel_type.startswith("USER_")] + ["RELATED_TO"]
+)
+
+_USER_CONTEXT_APOC_QUERY = """
+MATCH (user:User), (entity)
+WHERE user.id = $user_id AND entity.id = $entity_id
+CALL apoc.path.expandConfig(user, {
+    endNodes: [entity],
+    maxLevel: 4,
+    relationshipFilter: $rel_filter,
+    bfs: true,
+    limit: 1
+}) YIELD path
+RETURN path AS p
+"""
+
+# One undirected expansion per hop; type filters are parameters (null = no filter),
+# so the query text, and its plan, is the same for every call
+_EXPAND_FRONTIER_QUERY = """
+MATCH (n)-[r]-(m)
+WHERE n.id IN $node_ids
+  AND ($rel_types IS NULL OR type(r) IN $rel_types)
+  AND ($node_types IS NULL OR all(label IN $node_types WHERE label IN labels(m)))
+RETURN n.id AS src, m, r
+LIMIT $limit
+"""
+
+_USER_CONTEXT_QUERY = """
+MATCH p = shortestPath((user:User)-[*..4]-(entity))
+WHERE user.id = $user_id AND entity.id = $entity_id
+RETURN p
+"""
 
 class GraphTraversal:
     def __init__(self, graph_db):
@@ -16,61 +52,47 @@ class GraphTraversal:
         """
         Breadth-first multi-hop traversal from seed nodes, with relationship/node type filtering and cycle avoidance.
         """
-        visited = set()
         nodes = []
         relationships = []
-        queue = [(node_id, 0) for node_id in seed_node_ids]
         self.max_nodes_per_hop = max_nodes_per_hop
 
-        rel_filter = self._build_relationship_filter(relationship_types)
-        node_filter = self._build_node_filter(node_types)
-
-        while queue:
-            current_id, hop = queue.pop(0)
-            if hop > max_hops or current_id in visited:
-                continue
-            visited.add(current_id)
-            results = self._expand_from_node(current_id, hop, max_hops, rel_filter, node_filter)
-            for record in results:
+        # Level-synchronous BFS: each hop expands the whole frontier with one query.
+        # Ids are marked scheduled when first seen, so each node is collected and
+        # expanded once however many frontier nodes reach it.
+        frontier = list(dict.fromkeys(seed_node_ids))
+        scheduled = set(frontier)
+        for hop in range(max_hops + 1):
+            if not frontier:
+                break
+            next_frontier = []
+            for record in self._expand_frontier(frontier, relationship_types, node_types):
                 m = record.get('m')
                 r = record.get('r')
-                if m and m['id'] not in visited:
+                if m and m['id'] not in scheduled:
+                    scheduled.add(m['id'])
                     nodes.append(m)
-                    queue.append((m['id'], hop + 1))
+                    next_frontier.append(m['id'])
                 if r:
                     relationships.append(r)
                 if len(nodes) >= max_nodes_per_hop:
                     break
             if len(nodes) >= max_nodes_per_hop:
                 break
+            frontier = next_frontier
         return {"nodes": nodes, "relationships": relationships}
 
-    def _expand_from_node(self, node_id: str, current_hop: int, max_hops: int,
-                         relationship_filter: str = "", node_filter: str = ""):
-        """Expand a single hop from the given node using Cypher."""
-        query = f"""
-        MATCH (n)-[r{relationship_filter}]->(m{node_filter})
-        WHERE n.id = $node_id
-        RETURN m, r
-        UNION
-        MATCH (m{node_filter})-[r{relationship_filter}]->(n)
-        WHERE n.id = $node_id
-        RETURN m, r
-        LIMIT $limit
-        """
-        return self.graph_db.run_query(query, {"node_id": node_id, "limit": self.max_nodes_per_hop})
-
-    def _build_relationship_filter(self, relationship_types: Optional[List[str]]) -> str:
-        if relationship_types:
-            rels = '|'.join(relationship_types)
-            return f":{rels}"
-        return ""
-
-    def _build_node_filter(self, node_types: Optional[List[str]]) -> str:
-        if node_types:
-            types = ':'.join(node_types)
-            return f":{types}"
-        return ""
+    def _expand_frontier(self, node_ids: List[str], relationship_types: Optional[List[str]] = None,
+                         node_types: Optional[List[str]] = None):
+        """Expand one hop from every node in the frontier with a single Cypher query."""
+        return self.graph_db.run_query(
+            _EXPAND_FRONTIER_QUERY,
+            {
+                "node_ids": node_ids,
+                "rel_types": relationship_types or None,
+                "node_types": node_types or None,
+                "limit": self.max_nodes_per_hop * len(node_ids)
+            }
+        )
 
     def find_related_tasks(self, entity_id: str, status_filter: Optional[List[str]] = None):
         """Find tasks related to a specific entity (by RELATED_TO or EXTRACTED_FROM)."""
@@ -99,10 +121,16 @@ class GraphTraversal:
         return self.graph_db.run_query(query, {"task_id": task_id})
 
     def find_user_context(self, entity_id: str, user_id: str):
-        """Find paths connecting an entity to the user, prioritizing USER_* relationships."""
-        query = """
-        MATCH p = shortestPath((user:User)-[*..4]-(entity))
-        WHERE user.id = $user_id AND entity.id = $entity_id
-        RETURN p
         """
-        return self.graph_db.run_query(query, {"user_id": user_id, "entity_id": entity_id}) 
\ No newline at end of file
+        Find paths connecting an entity to the user, prioritizing USER_* relationships.
+        With APOC, a BFS over USER_*/RELATED_TO stops at the first path found; only
+        when there is none does it fall back to an unrestricted shortestPath.
+        """
+        params = {"user_id": user_id, "entity_id": entity_id}
+        if self.graph_db.has_apoc():
+            result = self.graph_db.run_query(
+                _USER_CONTEXT_APOC_QUERY, {**params, "rel_filter": _USER_CONTEXT_REL_FILTER}
+            )
+            if result:
+                return result
+        return self.graph_db.run_query(_USER_CONTEXT_QUERY, params) 
\ No newline at end of file
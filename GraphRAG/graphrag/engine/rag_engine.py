@@ -1,60 +1,99 @@
+import copy
+import hashlib
 import uuid
 from typing import List, Dict, Any, Optional
 import threading
 import time
-from collections import OrderedDict
+from collections import Counter, OrderedDict, defaultdict
+import numpy as np
 from backend.data_services.redis_cache import RedisCache
 from backend.data_services.cold_storage import store_in_cold_storage, retrieve_from_cold_storage
 
 from ..db.graph_db import Neo4jWrapper
 from ..db.vector_db import QdrantWrapper
 from ..embeddings.embedding import EmbeddingService
+from ..embeddings.cache import CachedEmbeddingService
+from ..config import SETTINGS
 from .graph_traversal import GraphTraversal
 import logging
 from datetime import datetime, timedelta, UTC
+import orjson
+
+def _canonical_bytes(obj):
+    return orjson.dumps(obj, default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
 
 class LRUCache:
-    def __init__(self, max_size=1000, ttl=1800):
-        self.cache = OrderedDict()
+    """
+    Thread-safe LRU + TTL cache split into independently locked shards (picked by
+    key hash), so concurrent lookups of different keys don't contend on one mutex.
+    Recency and eviction are per shard; small caches fall back to fewer shards
+    (down to one, i.e. exact LRU) so each shard keeps at least MIN_SHARD_SIZE entries.
+    """
+    MIN_SHARD_SIZE = 64
+
+    def __init__(self, max_size=1000, ttl=1800, n_shards=16):
+        if n_shards < 1 or n_shards & (n_shards - 1):
+            raise ValueError("n_shards must be a power of two")
+        while n_shards > 1 and max_size // n_shards < self.MIN_SHARD_SIZE:
+            n_shards //= 2
         self.max_size = max_size
         self.ttl = ttl
-        self.lock = threading.Lock()
+        self.shard_size = max(1, max_size // n_shards)
+        self._mask = n_shards - 1
+        self.shards = [(OrderedDict(), threading.Lock()) for _ in range(n_shards)]
+
+    def _shard(self, key):
+        return self.shards[hash(key) & self._mask]
 
     def get(self, key):
-        with self.lock:
-            if key in self.cache:
-                value, expire = self.cache.pop(key)
-                if expire > time.time():
-                    self.cache[key] = (value, expire)
-                    return value
-                else:
-                    # Expired
-                    return None
+        cache, lock = self._shard(key)
+        # Lock-free read: a single dict lookup is atomic under the GIL
+        entry = cache.get(key)
+        if entry is None:
             return None
+        value, expire = entry
+        if expire > time.time():
+            # Recency is best effort: skip it rather than wait when the shard is busy
+            if lock.acquire(blocking=False):
+                try:
+                    cache.move_to_end(key)
+                except KeyError:
+                    pass  # evicted concurrently
+                finally:
+                    lock.release()
+            return value
+        # Expired (unless another thread has replaced the entry meanwhile)
+        with lock:
+            if cache.get(key) is entry:
+                del cache[key]
+        return None
 
     def set(self, key, value):
-        with self.lock:
+        cache, lock = self._shard(key)
+        with lock:
             expire = time.time() + self.ttl
-            if key in self.cache:
-                self.cache.pop(key)
-            elif len(self.cache) >= self.max_size:
-                self.cache.popitem(last=False)
-            self.cache[key] = (value, expire)
+            if key in cache:
+                cache[key] = (value, expire)
+                cache.move_to_end(key)
+                return
+            if len(cache) >= self.shard_size:
+                cache.popitem(last=False)
+            cache[key] = (value, expire)
 
     def delete(self, key):
-        with self.lock:
-            if key in self.cache:
-                self.cache.pop(key)
+        cache, lock = self._shard(key)
+        with lock:
+            cache.pop(key, None)
 
     def clear(self):
-        with self.lock:
-            self.cache.clear()
+        for cache, lock in self.shards:
+            with lock:
+                cache.clear()
 
 # Initialize caches
 node_cache = LRUCache(max_size=10000, ttl=1800)  # 30 min
-embedding_cache = LRUCache(max_size=5000, ttl=3600)  # 60 min
-# Temporarily comment out Redis Cache initialization
-# redis_cache = RedisCache()
+# Connects on first use, so importing the engine doesn't require a reachable Redis
+redis_cache = RedisCache(lazy=True)
 
 # --- Node Caching ---
 def get_node_with_cache(node_id, node_type, graph_db):
@@ -76,16 +115,6 @@ def get_node_with_cache(node_id, node_type, graph_db):
         update_node_access_timestamp(node_id, graph_db)
     return node_data
 
-# --- Embedding Caching ---
-def get_embedding_with_cache(text, embedding_service):
-    text_hash = str(hash(text))
-    cached_embedding = embedding_cache.get(text_hash)
-    if cached_embedding is not None:
-        return cached_embedding
-    embedding = embedding_service.generate_embedding(text)
-    embedding_cache.set(text_hash, embedding)
-    return embedding
-
 # --- High-level Operation Cache ---
 def get_operation_cache(key):
     return redis_cache.get(key)
@@ -94,21 +123,40 @@ def set_operation_cache(key, value, ttl=600):
     redis_cache.set(key, value, ttl=ttl)
 
 # --- Cypher Query Result Caching ---
+QUERY_INDEX_PREFIX = "cypher_idx:"
+# Index sets outlive the longest calculate_ttl so a refresh never expires an older, longer entry
+QUERY_INDEX_TTL = 3600
+
+def _result_node_ids(result):
+    """Ids of the nodes (or id-carrying maps) in a query result, including inside list values"""
+    node_ids = set()
+    for record in result:
+        for value in record.values():
+            for item in value if isinstance(value, list) else (value,):
+                node_id = item.get("id") if hasattr(item, "get") else None
+                if node_id is not None:
+                    node_ids.add(node_id)
+    return node_ids
+
 def execute_query_with_cache(query, parameters, graph_db):
-    import pickle
     # Only cache if this is a Cypher query
     if not query.strip().lower().startswith((
         "match", "call", "with", "unwind", "create", "merge", "set", "delete", "remove", "return", "optional"
     )):
         raise ValueError("execute_query_with_cache called with non-Cypher query string.")
-    query_hash = str(hash(query + pickle.dumps(parameters).hex()))
-    cache_key = f"cypher_query:{query_hash}"
+    key_bytes = _canonical_bytes({"q": query, "p": parameters})
+    cache_key = "cypher_query:" + hashlib.blake2b(key_bytes, digest_size=16).hexdigest()
     cached_result = redis_cache.get(cache_key)
     if cached_result is not None:
         return cached_result
     result = graph_db.run_query(query, parameters)
     if is_cacheable_query(query):
-        redis_cache.set(cache_key, result, ttl=calculate_ttl(query))
+        ttl = calculate_ttl(query)
+        redis_cache.set(cache_key, result, ttl=ttl)
+        # Index the entry under every node id it returned, so updates drop only these keys
+        node_ids = _result_node_ids(result)
+        if node_ids:
+            redis_cache.add_to_sets([f"{QUERY_INDEX_PREFIX}{node_id}" for node_id in node_ids], cache_key, ttl=QUERY_INDEX_TTL)
     return result
 
 def is_cacheable_query(query):
@@ -122,12 +170,31 @@ def calculate_ttl(query):
     return 600  # 10 min
 
 def update_node_access_timestamp(node_id, graph_db):
-    query = """
-    MATCH (n) WHERE n.id = $node_id
-    SET n.last_accessed_at = datetime(),
-        n.access_count = COALESCE(n.access_count, 0) + 1
-    """
-    graph_db.execute_query(query, {"node_id": node_id})
+    # Queued rather than written per read; flushed in batches by write_queue
+    queue_write_operation("node_access", {"id": node_id, "graph_db": graph_db})
+
+_NODE_ACCESS_QUERY = """
+UNWIND $batch AS row
+MATCH (n) WHERE n.id = row.id
+SET n.last_accessed_at = datetime({epochMillis: row.ts}),
+    n.access_count = COALESCE(n.access_count, 0) + row.n
+"""
+
+def flush_node_access(ops):
+    """Write queued node accesses with one UNWIND: per node, the latest time and the number of hits."""
+    counts = Counter()
+    last_accessed = {}
+    for op in ops:
+        node_id = op["data"]["id"]
+        counts[node_id] += 1
+        last_accessed[node_id] = max(last_accessed.get(node_id, 0), op["timestamp"])
+    batch = [
+        {"id": node_id, "ts": int(last_accessed[node_id] * 1000), "n": n}
+        for node_id, n in counts.items()
+    ]
+    # Flushes run outside any request, so never reuse a request-scoped session
+    graph_db = ops[-1]["data"]["graph_db"].with_session(None)
+    graph_db.run_query(_NODE_ACCESS_QUERY, {"batch": batch}, invalidates=counts)
 
 # --- Cache Invalidation ---
 def invalidate_node_cache(node_id, node_type):
@@ -136,13 +203,12 @@ def invalidate_node_cache(node_id, node_type):
     redis_cache.delete(cache_key)
 
 def invalidate_related_query_cache(node_id):
-    # For simplicity, flush all query cache (could be more granular)
-    # In production, track which queries involve which nodes
-    redis_cache.flush()
+    # Drop only the cached queries whose results contained this node
+    redis_cache.delete_many(*redis_cache.pop_set(f"{QUERY_INDEX_PREFIX}{node_id}"))
 
 # --- Node/Relationship Update with Invalidation ---
 def update_node_with_cache(node_id, node_type, properties, graph_db):
-    result = graph_db.update_node(node_id, properties)
+    result = graph_db.update_node(node_type, {"id": node_id}, properties)
     invalidate_node_cache(node_id, node_type)
     # Invalidate related query cache if node has relationships
     if properties.get('relationships'):
@@ -150,7 +216,9 @@ def update_node_with_cache(node_id, node_type, properties, graph_db):
     return result
 
 def create_relationship_with_cache(source_id, source_type, target_id, target_type, rel_type, properties, graph_db):
-    result = graph_db.create_relationship(source_id, target_id, rel_type, properties)
+    result = graph_db.create_relationship(
+        source_type, target_type, rel_type, {"id": source_id}, {"id": target_id}, properties
+    )
     invalidate_node_cache(source_id, source_type)
     invalidate_node_cache(target_id, target_type)
     invalidate_related_query_cache(source_id)
@@ -197,13 +265,14 @@ def archive_nodes(node_batch, entity_type, graph_db):
         MATCH (n)
         WHERE n.id = $node_id
         SET n.status = 'archived',
-            n.archived_at = datetime.now(UTC),
+            n.archived_at = datetime(),
+            n.updated_at = datetime(),
             n.archive_reference = $archive_reference
         """
         params = {"node_id": node_id, "archive_reference": archive_reference}
         if entity_type == "Message":
             query += "\nSET n.content = NULL, n.has_archived_content = true"
-        graph_db.execute_query(query, params)
+        graph_db.run_query(query, params, invalidates=[node_id])
         invalidate_node_cache(node_id, entity_type)
 
 def get_node_with_archive_support(node_id, node_type, graph_db):
@@ -216,20 +285,56 @@ def get_node_with_archive_support(node_id, node_type, graph_db):
         update_node_access_timestamp(node_id, graph_db)
     return node
 
-# --- Batch Write Queue (Stub) ---
+# --- Batch Write Queue ---
 class WriteQueue:
-    def __init__(self, max_size=10000):
+    """
+    Buffers write operations and processes them in batches, once max_size are queued
+    or flush_interval seconds after the first one. Each batch is grouped by operation
+    type and handed to the handler registered for that type.
+    """
+    def __init__(self, max_size=10000, flush_interval=None):
         self.queue = []
         self.max_size = max_size
+        self.flush_interval = flush_interval
+        self.handlers = {}
+        self.lock = threading.Lock()
+        self._timer = None
+
+    def register(self, operation_type, handler):
+        self.handlers[operation_type] = handler
+
     def push(self, op):
-        self.queue.append(op)
-        if len(self.queue) >= self.max_size:
+        with self.lock:
+            self.queue.append(op)
+            full = len(self.queue) >= self.max_size
+            if not full and self.flush_interval and self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.process_batch)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
             self.process_batch()
-    def process_batch(self):
-        # Group and process batched operations (stub)
-        self.queue.clear()
 
-write_queue = WriteQueue()
+    def process_batch(self):
+        with self.lock:
+            batch, self.queue = self.queue, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        grouped = defaultdict(list)
+        for op in batch:
+            grouped[op["type"]].append(op)
+        for operation_type, ops in grouped.items():
+            handler = self.handlers.get(operation_type)
+            if handler is None:
+                continue  # no batched writer for this type yet
+            try:
+                handler(ops)
+            except Exception as e:
+                logging.warning(f"Batched {operation_type} write of {len(ops)} operations failed: {e}")
+
+# Flush policy: 256 operations or 50 ms after the first queued one, whichever comes first
+write_queue = WriteQueue(max_size=256, flush_interval=0.05)
+write_queue.register("node_access", flush_node_access)
 
 def queue_write_operation(operation_type, data):
     write_queue.push({
@@ -241,7 +346,6 @@ def queue_write_operation(operation_type, data):
 # --- Monitoring and Scheduled Jobs ---
 cache_metrics = {
     'node_cache': {'get': {'hit': 0, 'miss': 0}},
-    'embedding_cache': {'get': {'hit': 0, 'miss': 0}},
     'redis_cache': {'get': {'hit': 0, 'miss': 0}},
 }
 
@@ -272,6 +376,9 @@ def schedule_pruning_job(graph_db, interval_hours=24):
 # Example: start scheduled job (in production, call this from app startup)
 # schedule_pruning_job(graph_db_instance)
 
+_initialized_collections = set()
+_initialized_collections_lock = threading.Lock()
+
 class GraphRAGEngine:
     def __init__(
         self,
@@ -284,24 +391,48 @@ class GraphRAGEngine:
     ):
         self.graph_db = graph_db or Neo4jWrapper()
         self.vector_db = vector_db or QdrantWrapper()
-        self.embedding_service = embedding_service or EmbeddingService()
+        # Query and document embeddings go through one content-hashed LRU
+        if embedding_service is None:
+            embedding_service = EmbeddingService(cache_size=0)
+        if not isinstance(embedding_service, CachedEmbeddingService):
+            embedding_service = CachedEmbeddingService(
+                embedding_service,
+                max_size=SETTINGS.EMBEDDING_CACHE_SIZE,
+                ttl=SETTINGS.EMBEDDING_CACHE_TTL
+            )
+        self.embedding_service = embedding_service
         self.collection_name = collection_name
         self.similarity_threshold = similarity_threshold
         self.max_results = max_results
         self.graph_traversal = GraphTraversal(self.graph_db)
         self._initialize_collection()
 
+    def with_session(self, session):
+        """
+        Return a copy of this engine whose graph calls all run on `session`; the
+        vector store, embedding service and collection setup are shared.
+        """
+        bound = copy.copy(self)
+        bound.graph_db = self.graph_db.with_session(session)
+        bound.graph_traversal = GraphTraversal(bound.graph_db)
+        return bound
+
     def _initialize_collection(self) -> None:
-        # For simplicity, always try to create the collection (Qdrant will not overwrite if exists)
-        sample_embedding = self.embedding_service.model.encode(["Sample text"])[0]
-        dimension = len(sample_embedding)
-        try:
-            self.vector_db.client.recreate_collection(
-                collection_name=self.collection_name,
-                vectors_config={"size": dimension, "distance": "Cosine"}
-            )
-        except Exception:
-            pass
+        # Several engines may share a process; only check/create the collection once
+        if self.collection_name in _initialized_collections:
+            return
+        with _initialized_collections_lock:
+            if self.collection_name in _initialized_collections:
+                return
+            try:
+                if not self.vector_db.client.collection_exists(self.collection_name):
+                    self.vector_db.client.create_collection(
+                        collection_name=self.collection_name,
+                        vectors_config={"size": self.embedding_service.embedding_dim, "distance": "Cosine"}
+                    )
+                _initialized_collections.add(self.collection_name)
+            except Exception:
+                pass
 
     def store_document(
         self,
@@ -310,54 +441,83 @@ class GraphRAGEngine:
         node_type: str,
         relationships: Optional[List[Dict]] = None
     ) -> str:
-        doc_id = str(uuid.uuid4())
-        properties = {"id": doc_id, **metadata}
-        # Only add text/content if the node type supports it
-        if node_type == "Message":
-            properties["content"] = text
-        elif node_type in ["Document"]:  # Add other types with 'text' property if needed
-            properties["text"] = text
-        self.graph_db.create_node(node_type, properties)
-        if relationships:
-            for rel in relationships:
-                self.graph_db.create_relationship(
+        return self.store_documents([{
+            "text": text,
+            "metadata": metadata,
+            "node_type": node_type,
+            "relationships": relationships
+        }])[0]
+
+    def store_documents(self, docs: List[Dict[str, Any]]) -> List[str]:
+        """
+        Store many documents at once. Each doc is {"text", "metadata", "node_type",
+        "relationships"} as for store_document; returns the new ids in order.
+        Everything is validated and embedded (one model call) before any write; nodes
+        (one UNWIND per label) and edges (one per label, target, type) then commit in
+        a single transaction, and vectors go in one batched upsert.
+        """
+        doc_ids = [str(uuid.uuid4()) for _ in docs]
+        rows_by_label = defaultdict(list)
+        edges_by_type = defaultdict(list)
+        for doc_id, doc in zip(doc_ids, docs):
+            node_type = doc["node_type"]
+            text = doc.get("text")
+            properties = {"id": doc_id, **doc["metadata"]}
+            # Only add text/content if the node type supports it
+            if node_type == "Message":
+                properties["content"] = text
+            elif node_type in ["Document"]:  # Add other types with 'text' property if needed
+                properties["text"] = text
+            rows_by_label[node_type].append(properties)
+            for rel in doc.get("relationships") or []:
+                edges_by_type[(node_type, rel["target_type"], rel["rel_type"])].append({
+                    "src": doc_id,
+                    "dst": rel["target_id"],
+                    "props": rel.get("properties", {})
+                })
+        for node_type, rows in rows_by_label.items():
+            self.graph_db.validate_node_rows(node_type, rows)
+        for (node_type, target_type, rel_type), edges in edges_by_type.items():
+            self.graph_db.validate_edges(node_type, target_type, rel_type, edges)
+        embeddings = self.embedding_service.get_embeddings(
+            [doc.get("text") or doc["metadata"].get("name", "") for doc in docs]
+        )
+        with self.graph_db.transaction() as graph_db:
+            # Ids are fresh uuids, so merging by id creates every node
+            for node_type, rows in rows_by_label.items():
+                graph_db.bulk_merge_nodes(node_type, rows)
+            for (node_type, target_type, rel_type), edges in edges_by_type.items():
+                graph_db.bulk_merge_relationships(
                     from_label=node_type,
-                    to_label=rel["target_type"],
-                    rel_type=rel["rel_type"],
-                    from_props={"id": doc_id},
-                    to_props={"id": rel["target_id"]},
-                    rel_props=rel.get("properties", {})
+                    to_label=target_type,
+                    rel_type=rel_type,
+                    edges=edges
                 )
-        # Use embedding cache
-        if text:
-            embedding = get_embedding_with_cache(text, self.embedding_service)
-        else:
-            embedding = get_embedding_with_cache(metadata.get('name', ''), self.embedding_service)
-        self.vector_db.upsert_embedding(
+        self.vector_db.upsert_embeddings(
             collection=self.collection_name,
-            id=doc_id,
-            vector=embedding,
-            payload={
-                "text": text,
-                "node_type": node_type,
-                **metadata
-            }
+            ids=doc_ids,
+            vectors=embeddings,
+            payloads=[
+                {"text": doc.get("text"), "node_type": doc["node_type"], **doc["metadata"]}
+                for doc in docs
+            ]
         )
-        return doc_id
+        return doc_ids
     
     def semantic_search(self, query_text: str, filters: Optional[Dict] = None) -> List[Dict]:
-        # Use embedding cache for query embedding
-        query_embedding = get_embedding_with_cache(query_text, self.embedding_service)
+        query_embedding = self.embedding_service.get_embedding(query_text)
         vector_results = self.vector_db.search_vectors(
             collection_name=self.collection_name,
             query_vector=query_embedding,
             limit=self.max_results
         )
-        relevant_results = [
-            {"id": r.id, "score": r.score, "payload": r.payload}
-            for r in vector_results if r.score >= self.similarity_threshold
+        # Threshold all scores with one mask rather than a comparison per hit
+        scores = np.fromiter((r.score for r in vector_results), dtype=np.float64, count=len(vector_results))
+        keep = np.flatnonzero(scores >= self.similarity_threshold)
+        return [
+            {"id": vector_results[i].id, "score": vector_results[i].score, "payload": vector_results[i].payload}
+            for i in keep
         ]
-        return relevant_results
 
     def hybrid_search(
         self,
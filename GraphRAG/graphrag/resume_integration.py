@@ -1,13 +1,19 @@
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from .db.graph_db import Neo4jWrapper
 from .db.vector_db import QdrantWrapper
 from .embeddings.embedding_service import get_embedding
 
 class ResumeGraphIntegrator:
-    def __init__(self):
-        self.graph_db = Neo4jWrapper()
-        self.vector_db = QdrantWrapper()
+    def __init__(
+        self,
+        graph_db: Optional[Neo4jWrapper] = None,
+        vector_db: Optional[QdrantWrapper] = None
+    ):
+        # Shared (e.g. request-bound) clients may be passed in; only clients created here are closed
+        self._owns_graph_db = graph_db is None
+        self.graph_db = graph_db or Neo4jWrapper()
+        self.vector_db = vector_db or QdrantWrapper()
 
     def integrate_resume(self, user_id: str, resume_data: Dict[str, Any]):
         """
@@ -17,115 +23,92 @@ class ResumeGraphIntegrator:
         if not self.graph_db.node_exists("User", {"id": user_id}):
             raise ValueError(f"User {user_id} not found in graph database")
 
+        # Nodes and edges are collected per label / relationship type and written
+        # with one UNWIND each, all inside a single transaction
+        now = datetime.now()
+        node_rows = {"Organization": [], "Skill": [], "Certification": [], "Language": []}
+        edges = {
+            ("Organization", "WORKED_AT"): [],
+            ("Organization", "LEARNT_AT"): [],
+            ("Skill", "HAS_SKILL"): [],
+            ("Certification", "HAS_CERTIFICATION"): [],
+            ("Language", "SPEAKS"): [],
+        }
+
         # 2. Process work experience
         for exp in resume_data.get("work_experience", []):
-            # Create or update Organization node
             org_id = f"org_{exp['company'].lower().replace(' ', '_')}"
-            self.graph_db.merge_node("Organization", {
+            node_rows["Organization"].append({
                 "id": org_id,
                 "name": exp["company"],
                 "type": "company",
-                "created_at": datetime.now()
+                "created_at": now
             })
-
-            # Create or update WORKED_AT relationship
-            self.graph_db.merge_relationship(
-                "User", "Organization",
-                "WORKED_AT",
-                {"id": user_id},
-                {"id": org_id},
-                {
+            edges[("Organization", "WORKED_AT")].append({
+                "src": user_id,
+                "dst": org_id,
+                "props": {
                     "title": exp["title"],
                     "start_date": exp["start"],
                     "end_date": exp["end"],
                     "location": exp.get("location", ""),
                     "skills_used": exp.get("skills_used", [])
                 }
-            )
+            })
 
         # 3. Process education
         for edu in resume_data.get("education", []):
-            # Create or update Organization node for educational institution
             school_id = f"edu_{edu['school'].lower().replace(' ', '_')}"
-            self.graph_db.merge_node("Organization", {
+            node_rows["Organization"].append({
                 "id": school_id,
                 "name": edu["school"],
                 "type": "educational",
-                "created_at": datetime.now()
+                "created_at": now
             })
-
-            # Create or update LEARNT_AT relationship
-            self.graph_db.merge_relationship(
-                "User", "Organization",
-                "LEARNT_AT",
-                {"id": user_id},
-                {"id": school_id},
-                {
+            edges[("Organization", "LEARNT_AT")].append({
+                "src": user_id,
+                "dst": school_id,
+                "props": {
                     "degree": edu["degree"],
                     "start_date": edu["start"],
                     "end_date": edu["end"],
                     "location": edu.get("location", ""),
                     "description": edu.get("description", "")
                 }
-            )
+            })
 
         # 4. Process skills
         for skill in resume_data.get("skills", []):
-            # Create or update skill node
             skill_id = f"skill_{skill.lower().replace(' ', '_')}"
-            self.graph_db.merge_node("Skill", {
-                "id": skill_id,
-                "name": skill,
-                "created_at": datetime.now()
-            })
-
-            # Create or update HAS_SKILL relationship
-            self.graph_db.merge_relationship(
-                "User", "Skill",
-                "HAS_SKILL",
-                {"id": user_id},
-                {"id": skill_id},
-                {
+            node_rows["Skill"].append({"id": skill_id, "name": skill, "created_at": now})
+            edges[("Skill", "HAS_SKILL")].append({
+                "src": user_id,
+                "dst": skill_id,
+                "props": {
                     "proficiency": "intermediate",  # Could be extracted from resume
                     "years_experience": 0  # Could be calculated from work experience
                 }
-            )
+            })
 
         # 5. Process certifications
         for cert in resume_data.get("certifications", []):
-            # Create or update certification node
             cert_id = f"cert_{cert.lower().replace(' ', '_')}"
-            self.graph_db.merge_node("Certification", {
-                "id": cert_id,
-                "name": cert,
-                "created_at": datetime.now()
-            })
-
-            # Create or update HAS_CERTIFICATION relationship
-            self.graph_db.merge_relationship(
-                "User", "Certification",
-                "HAS_CERTIFICATION",
-                {"id": user_id},
-                {"id": cert_id}
-            )
+            node_rows["Certification"].append({"id": cert_id, "name": cert, "created_at": now})
+            edges[("Certification", "HAS_CERTIFICATION")].append({"src": user_id, "dst": cert_id})
 
         # 6. Process languages
         for lang in resume_data.get("languages", []):
-            # Create or update language node
             lang_id = f"lang_{lang.lower().replace(' ', '_')}"
-            self.graph_db.merge_node("Language", {
-                "id": lang_id,
-                "name": lang,
-                "created_at": datetime.now()
-            })
+            node_rows["Language"].append({"id": lang_id, "name": lang, "created_at": now})
+            edges[("Language", "SPEAKS")].append({"src": user_id, "dst": lang_id})
 
-            # Create or update SPEAKS relationship
-            self.graph_db.merge_relationship(
-                "User", "Language",
-                "SPEAKS",
-                {"id": user_id},
-                {"id": lang_id}
-            )
+        # One transaction on the wrapper's (possibly request-bound) session;
+        # cached nodes are invalidated only once it commits
+        with self.graph_db.transaction() as graph_db:
+            for label, rows in node_rows.items():
+                graph_db.bulk_merge_nodes(label, rows)
+            for (label, rel_type), rel_edges in edges.items():
+                graph_db.bulk_merge_relationships("User", label, rel_type, rel_edges)
 
         # 7. Create vector embeddings for searchable content
         # Create embedding for user profile
@@ -146,4 +129,5 @@ class ResumeGraphIntegrator:
 
     def close(self):
         """Close database connections"""
-        self.graph_db.close() 
\ No newline at end of file
+        if self._owns_graph_db:
+            self.graph_db.close() 
\ No newline at end of file
@@ -18,16 +18,18 @@ REDIS_RETRY_ATTEMPTS = 3
 REDIS_RETRY_DELAY = 1  # seconds
 
 class RedisCache:
-    def __init__(self, host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB):
-        print(f"[RedisCache] Connecting to Redis at {host}:{port} db={db}")
+    def __init__(self, host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, lazy=False):
+        """With lazy=True the connection is opened on first use instead of here."""
         self.host = host
         self.port = port
         self.db = db
         self.client = None
-        self.connect()
+        if not lazy:
+            self.connect()
 
     def connect(self):
         """Establish Redis connection with retry logic"""
+        print(f"[RedisCache] Connecting to Redis at {self.host}:{self.port} db={self.db}")
         for attempt in range(REDIS_RETRY_ATTEMPTS):
             try:
                 self.client = redis.Redis(
@@ -58,6 +60,9 @@ class RedisCache:
 
     def ensure_connection(self):
         """Ensure Redis connection is active, reconnect if necessary"""
+        if self.client is None:
+            self.connect()
+            return True
         try:
             self.client.ping()
             return True
@@ -106,6 +111,45 @@ class RedisCache:
             logger.error(f"Error deleting key {key} from Redis: {str(e)}")
             raise
 
+    def add_to_sets(self, set_keys, member: str, ttl: Optional[int] = None):
+        """Add member to each of the given sets (one pipelined round-trip), refreshing their TTL"""
+        try:
+            self.ensure_connection()
+            pipe = self.client.pipeline(transaction=False)
+            for set_key in set_keys:
+                pipe.sadd(set_key, member)
+                if ttl:
+                    pipe.expire(set_key, ttl)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Error adding {member} to index sets in Redis: {str(e)}")
+            raise
+
+    def pop_set(self, key: str) -> set:
+        """Return the members of a set and delete it"""
+        try:
+            self.ensure_connection()
+            pipe = self.client.pipeline()
+            pipe.smembers(key)
+            pipe.delete(key)
+            members, _ = pipe.execute()
+            return members
+        except Exception as e:
+            logger.error(f"Error popping set {key} from Redis: {str(e)}")
+            raise
+
+    def delete_many(self, *keys):
+        """Delete several keys in one command"""
+        if not keys:
+            return
+        try:
+            self.ensure_connection()
+            self.client.delete(*keys)
+            logger.debug(f"Deleted {len(keys)} keys from Redis")
+        except Exception as e:
+            logger.error(f"Error deleting keys from Redis: {str(e)}")
+            raise
+
     def exists(self, key: str) -> bool:
         """Check if a key exists in Redis"""
         try:
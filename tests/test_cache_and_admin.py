@@ -1,16 +1,24 @@
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import asyncio
+import base64
 import tempfile
 import time
+from types import SimpleNamespace
 import pytest
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
 from backend.data_services.redis_cache import RedisCache
 from backend.data_services.cold_storage import store_in_cold_storage, retrieve_from_cold_storage
 from backend.GraphRAG.graphrag.engine.rag_engine import LRUCache, invalidate_node_cache, node_cache, redis_cache
 from backend.GraphRAG.graphrag.api.main import app
+from backend.GraphRAG.graphrag.api import dependencies
+from backend.GraphRAG.graphrag.api.dependencies import admin_token_digest, require_admin
 
-client = TestClient(app)
+ADMIN_SECRET = 'test-admin-secret'
+ADMIN_HEADERS = {'Authorization': 'Bearer ' + base64.b64encode(admin_token_digest(ADMIN_SECRET)).decode()}
+BAD_HEADERS = {'Authorization': 'Bearer ' + base64.b64encode(b'bad creds').decode()}
 
 # --- LRUCache Tests ---
 def test_lru_cache_basic():
@@ -55,26 +63,51 @@ def test_invalidate_node_cache():
     assert redis_cache.get('Test:1') is None
 
 # --- Admin Endpoints ---
-def test_admin_prune_auth():
+@pytest.fixture
+def client(monkeypatch):
+    settings = dependencies.get_settings().model_copy(update={'ADMIN_TOKEN_SECRET': ADMIN_SECRET})
+    monkeypatch.setattr(dependencies, 'get_settings', lambda: settings)
+    # Entering the client runs the lifespan, which derives the admin token digest
+    with TestClient(app) as client:
+        yield client
+
+def test_admin_prune_auth(client):
     # No auth
     r = client.post('/api/admin/prune')
     assert r.status_code == 401
     # Wrong auth
-    r = client.post('/api/admin/prune', auth=('bad', 'creds'))
+    r = client.post('/api/admin/prune', headers=BAD_HEADERS)
     assert r.status_code == 403
     # Correct auth
-    r = client.post('/api/admin/prune', auth=('admin', 'changeme'))
+    r = client.post('/api/admin/prune', headers=ADMIN_HEADERS)
     assert r.status_code == 202
     assert r.json()['status'] == 'pruning job triggered'
 
-def test_admin_archive_auth():
+def test_admin_archive_auth(client):
     # No auth
     r = client.post('/api/admin/archive', json={'entity_type': 'Test', 'node_ids': ['1','2']})
     assert r.status_code == 401
     # Wrong auth
-    r = client.post('/api/admin/archive', json={'entity_type': 'Test', 'node_ids': ['1','2']}, auth=('bad', 'creds'))
+    r = client.post('/api/admin/archive', json={'entity_type': 'Test', 'node_ids': ['1','2']}, headers=BAD_HEADERS)
     assert r.status_code == 403
     # Correct auth
-    r = client.post('/api/admin/archive', json={'entity_type': 'Test', 'node_ids': ['1','2']}, auth=('admin', 'changeme'))
+    r = client.post('/api/admin/archive', json={'entity_type': 'Test', 'node_ids': ['1','2']}, headers=ADMIN_HEADERS)
     assert r.status_code == 202
-    assert r.json()['status'] == 'archive job triggered' 
\ No newline at end of file
+    assert r.json()['status'] == 'archive job triggered'
+
+def test_require_admin_status_codes():
+    digest = admin_token_digest("secret")
+    request = SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(admin_token_digest=digest)))
+    with pytest.raises(HTTPException) as missing:
+        asyncio.run(require_admin(request, None))
+    assert missing.value.status_code == 401
+    assert missing.value.headers == {"WWW-Authenticate": "Bearer"}
+    with pytest.raises(HTTPException) as wrong:
+        asyncio.run(require_admin(request, "Bearer " + base64.b64encode(b"nope").decode()))
+    assert wrong.value.status_code == 403
+    assert asyncio.run(require_admin(request, "Bearer " + base64.b64encode(digest).decode())) is None
+    # No digest on app.state (lifespan not run) takes the admin-disabled path, not a 500
+    bare = SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace()))
+    with pytest.raises(HTTPException) as disabled:
+        asyncio.run(require_admin(bare, "Bearer " + base64.b64encode(digest).decode()))
+    assert disabled.value.status_code == 403
@@ -0,0 +1,76 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import asyncio
+import threading
+import time
+import numpy as np
+from backend.GraphRAG.graphrag.embeddings.embedding import EmbeddingService
+from backend.GraphRAG.graphrag.embeddings.cache import CachedEmbeddingService
+
+class FakeEmbeddingService(EmbeddingService):
+    """EmbeddingService whose model is a deterministic function of the text"""
+    def __init__(self, delay=0.0, **kwargs):
+        super().__init__(embedding_dim=4, **kwargs)
+        self.batches = []
+        self.delay = delay
+        self.started = threading.Event()
+
+    def _embed_batch(self, texts):
+        self.batches.append(list(texts))
+        self.started.set()
+        time.sleep(self.delay)
+        return np.array([[len(t), t.count("a"), 1.0, 0.0] for t in texts], dtype=np.float32)
+
+def test_cache_key_is_a_fixed_size_digest():
+    service = FakeEmbeddingService()
+    key = service._generate_cache_key("x" * 10000)
+    assert isinstance(key, bytes) and len(key) == 16
+    assert key == service._generate_cache_key("x" * 10000)
+    assert key != service._generate_cache_key("x" * 9999)
+
+def test_get_embeddings_embeds_distinct_misses_once():
+    service = FakeEmbeddingService(cache_size=0)
+    cached = CachedEmbeddingService(service, max_size=10, ttl=60)
+    vectors = cached.get_embeddings(["aa", "b", "aa"])
+    assert service.batches == [["aa", "b"]]
+    np.testing.assert_array_equal(vectors[0], vectors[2])
+    np.testing.assert_array_equal(cached.get_embedding("b"), vectors[1])
+    assert service.batches == [["aa", "b"]]
+
+def test_wrapped_service_does_not_cache_twice():
+    service = FakeEmbeddingService(cache_size=0)
+    cached = CachedEmbeddingService(service, max_size=10, ttl=60)
+    asyncio.run(cached.embed(["aa", "b"]))
+    asyncio.run(cached.embed("aa"))
+    assert service.batches == [["aa", "b"]]
+    assert len(service._cache) == 0
+    assert cached.stats()["size"] == 2
+
+def test_concurrent_misses_share_one_embedding():
+    service = FakeEmbeddingService(delay=0.05)
+
+    async def both():
+        return await asyncio.gather(service.embed("aa"), service.embed("aa"))
+
+    first, second = asyncio.run(both())
+    assert service.batches == [["aa"]]
+    np.testing.assert_array_equal(first, second)
+    assert service._inflight == {}
+
+def test_concurrent_misses_across_event_loops():
+    service = FakeEmbeddingService(delay=0.2, cache_size=0)
+    results = {}
+
+    def embed_in_new_loop(name):
+        results[name] = asyncio.run(service.embed("aa"))
+
+    owner = threading.Thread(target=embed_in_new_loop, args=("owner",))
+    owner.start()
+    assert service.started.wait(5)
+    waiter = threading.Thread(target=embed_in_new_loop, args=("waiter",))
+    waiter.start()
+    owner.join(5)
+    waiter.join(5)
+    assert service.batches == [["aa"]]
+    np.testing.assert_array_equal(results["owner"], results["waiter"])
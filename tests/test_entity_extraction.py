@@ -3,7 +3,10 @@ import os
 import pytest
 from datetime import datetime
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from backend.GraphRAG.graphrag.engine.entity_extraction import EntityExtractor
+import numpy as np
+from backend.GraphRAG.graphrag.engine.entity_extraction import (
+    EntityExtractor, _pair_indices, _pair_indices_numpy, _pair_indices_fast
+)
 
 @pytest.fixture(scope="module")
 def extractor():
@@ -65,4 +68,74 @@ def test_no_false_positives(extractor):
     text = "The quick brown fox jumps over the lazy dog."
     entities = extractor.extract_entities(text)
     print("Entities in neutral text:", entities)
-    assert len(entities) == 0 
\ No newline at end of file
+    assert len(entities) == 0 
+
+@pytest.mark.parametrize("pair_indices", [_pair_indices, _pair_indices_numpy, _pair_indices_fast])
+def test_pair_indices_match_brute_force(pair_indices):
+    rng = np.random.default_rng(0)
+    valid = rng.random((6, 6)) < 0.4
+    for n in (0, 1, 2, 17):
+        type_ids = rng.integers(0, 6, size=n)
+        i_idx, j_idx = pair_indices(type_ids, valid)
+        expected = [(i, j) for i in range(n) for j in range(i + 1, n) if valid[type_ids[i], type_ids[j]]]
+        assert list(zip(i_idx.tolist(), j_idx.tolist())) == expected
+
+class FakeSpan:
+    def __init__(self, text, start_char, end_char):
+        self.text = text[start_char:end_char]
+        self.start_char = start_char
+        self.end_char = end_char
+
+class FakeDoc:
+    """Just the ents/sents extract_relationships reads, without running spaCy"""
+    def __init__(self, text, ent_spans, sent_spans):
+        self.ents = [FakeSpan(text, start, end) for start, end in ent_spans]
+        self.sents = [FakeSpan(text, start, end) for start, end in sent_spans]
+
+@pytest.fixture
+def bare_extractor():
+    extractor = EntityExtractor.__new__(EntityExtractor)
+    entity_types = sorted(set(t for pair in EntityExtractor._REL_MAP for t in pair) | {"ContactInfo"})
+    extractor._type_ids = {t: i for i, t in enumerate(entity_types)}
+    extractor._valid_pairs = np.array([
+        [extractor._infer_relationship_type(a, b) is not None for b in entity_types]
+        for a in entity_types
+    ], dtype=np.bool_)
+    return extractor
+
+def test_relationships_grouped_by_sentence(bare_extractor):
+    text = "Alice of Acme in Paris. Bob at Initech. Big. Co hired Carol, carol@x.io. Dave Ltd"
+    sentence_spans = []
+    start = 0
+    for end in [i + 1 for i, ch in enumerate(text) if ch == "."] + [len(text)]:
+        sentence_spans.append((start, end))
+        start = end + 1
+    types = {
+        "Alice": "Person", "Acme": "Organization", "Paris": "Location", "Bob": "Person",
+        "Initech": "Organization", "Big. Co": "Organization", "Carol": "Person",
+        "carol@x.io": "ContactInfo", "Dave": "Person"
+    }
+    entities = [
+        {"text": word, "type": entity_type, "start_char": text.index(word), "end_char": text.index(word) + len(word)}
+        for word, entity_type in types.items()
+    ]
+    # "Big. Co" crosses a sentence end; "Ltd" is a spaCy entity that wasn't extracted
+    ent_spans = sorted([(e["start_char"], e["end_char"]) for e in entities] + [(text.index("Ltd"), len(text))])
+    doc = FakeDoc(text, ent_spans, sentence_spans)
+    relationships = bare_extractor.extract_relationships(text, entities, doc=doc)
+    found = [
+        (r["source_entity"]["text"], r["relationship_type"], r["target_entity"]["text"], r["extracted_from"])
+        for r in relationships
+    ]
+    assert found == [
+        ("Alice", "AFFILIATED_WITH", "Acme", "Alice of Acme in Paris."),
+        ("Alice", "LOCATED_AT", "Paris", "Alice of Acme in Paris."),
+        ("Acme", "LOCATED_AT", "Paris", "Alice of Acme in Paris."),
+        ("Bob", "AFFILIATED_WITH", "Initech", "Bob at Initech."),
+    ]
+
+def test_relationships_need_two_entities(bare_extractor):
+    text = "Alice."
+    entities = [{"text": "Alice", "type": "Person", "start_char": 0, "end_char": 5}]
+    doc = FakeDoc(text, [(0, 5)], [(0, 6)])
+    assert bare_extractor.extract_relationships(text, entities, doc=doc) == []
@@ -0,0 +1,56 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import numpy as np
+import pytest
+from backend.GraphRAG.graphrag.engine.entity_resolution import EntityResolutionEngine, _bitset_jaccard
+
+def _jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+def test_bitset_jaccard_matches_set_jaccard():
+    rng = np.random.default_rng(0)
+    # More than 64 distinct ids so rows span several uint64 words
+    neighbour_sets = [set(rng.choice(200, size=rng.integers(0, 40), replace=False).tolist()) for _ in range(30)]
+    neighbour_sets[3] = set()
+    idx1, idx2 = np.triu_indices(len(neighbour_sets), 1)
+    scores = _bitset_jaccard(neighbour_sets, idx1, idx2)
+    expected = [_jaccard(neighbour_sets[i], neighbour_sets[j]) for i, j in zip(idx1, idx2)]
+    np.testing.assert_allclose(scores, expected)
+
+def test_bitset_jaccard_all_empty():
+    scores = _bitset_jaccard([set(), set()], np.array([0]), np.array([1]))
+    assert scores.tolist() == [0.0]
+
+class FakeGraphDB:
+    """Answers _calculate_relationship_overlap from in-memory neighbour sets"""
+    def __init__(self, related):
+        self.related = related
+
+    def run_query(self, query, parameters=None):
+        a = self.related[parameters["entity1_id"]]
+        b = self.related[parameters["entity2_id"]]
+        return [{"jaccard": _jaccard(a, b)}]
+
+@pytest.fixture
+def entities():
+    return {
+        "p1": {"id": "p1", "name": "Alice Smith", "email": "alice@example.com", "title": "CTO"},
+        "p2": {"id": "p2", "name": "Smith Alice", "email": "alice@example.com", "title": "CEO"},
+        "p3": {"id": "p3", "name": "Bob Jones", "phone": "555-0100"},
+        "p4": {"id": "p4", "text": "Alice"},
+    }
+
+def test_score_pairs_matches_pairwise_similarity(entities):
+    related = {"p1": {"a", "b", "c"}, "p2": {"b", "c", "d"}, "p3": set(), "p4": {"a"}}
+    engine = EntityResolutionEngine.__new__(EntityResolutionEngine)
+    engine.graph_db = FakeGraphDB(related)
+    pairs = [("p1", "p2"), ("p1", "p3"), ("p2", "p3"), ("p1", "p4"), ("p4", "p1")]
+    scores = engine._score_pairs(entities, related, pairs)
+    expected = [engine._calculate_entity_similarity(entities[a], entities[b]) for a, b in pairs]
+    np.testing.assert_allclose(scores, expected)
+    # Token order doesn't matter for names; mismatched name fields never match
+    assert scores[0] > 0.8
+    assert scores[3] == 0.0 and scores[4] == 0.0
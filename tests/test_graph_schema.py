@@ -1,9 +1,11 @@
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
 from backend.GraphRAG.graphrag.db.graph_db import Neo4jWrapper
+from backend.GraphRAG.graphrag.db import graph_schema
 from backend.GraphRAG.graphrag.db.graph_schema import (
-    initialize_graph_schema, NODE_TYPES, RELATIONSHIP_TYPES,
+    initialize_graph_schema, NODE_TYPES, RELATIONSHIP_TYPES, CONTEXT_TAGS,
     classify_communication_context, infer_relationship_from_communication
 )
 from datetime import datetime
@@ -93,6 +95,37 @@ def test_context_classification():
     )
     print("Context tags:", tags)
 
+_TAG_MESSAGES = [
+    "Let's meet for a research project with the professor.",
+    "Two meetings today, then the meeting, 3pm",
+    "Our study group and study_group chat",
+    "INVOICE#42 and Payment-due; see the paper",
+    "nothing relevant here",
+    "",
+]
+
+def _baseline_tags(message_content):
+    # Reference semantics: a tag matches when it is a substring of a whitespace token
+    return {
+        tag
+        for phrase in message_content.lower().split()
+        for tags in CONTEXT_TAGS.values()
+        for tag in tags
+        if tag in phrase
+    }
+
+@pytest.mark.parametrize("message", _TAG_MESSAGES)
+def test_context_tags_match_on_both_paths(message, monkeypatch):
+    expected = _baseline_tags(message)
+    if graph_schema._TAG_AUTOMATON is not None:
+        assert set(classify_communication_context(message, "a@example.com", [], "email")) == expected
+    monkeypatch.setattr(graph_schema, "_TAG_AUTOMATON", None)
+    assert set(classify_communication_context(message, "a@example.com", [], "email")) == expected
+
+def test_context_tags_from_domain():
+    tags = classify_communication_context("hello", "a@example.com", ["b@University.edu"], "email")
+    assert tags == ["academic"]
+
 def test_relationship_inference():
     print("Testing relationship inference...")
     cleanup_test_nodes()
@@ -111,6 +144,45 @@ def test_relationship_inference():
     print("Relationship inference: PASS (check Neo4j for USER_KNOWS rel)")
     neo4j.close()
 
+def _history(n):
+    base = datetime(2024, 1, 1).timestamp()
+    # Out-of-order timestamps with a few missing/empty channels
+    return [
+        {
+            "timestamp": datetime.fromtimestamp(base + ((k * 7919) % n) * 60),
+            "sentiment": ((k % 5) - 2) / 2,
+            "channel_id": "" if k % 11 == 0 else (None if k % 13 == 0 else f"c{k % 4}")
+        }
+        for k in range(n)
+    ]
+
+@pytest.mark.parametrize("use_jit", [True, False])
+@pytest.mark.parametrize("n", [1, 7, 1500])
+def test_aggregate_history_paths_agree(monkeypatch, use_jit, n):
+    # Without numba the kernel still runs as plain Python, so both branches are exercised
+    kernel = (graph_schema._aggregate_arrays_jit or graph_schema._aggregate_arrays) if use_jit else None
+    monkeypatch.setattr(graph_schema, "_aggregate_arrays_jit", kernel)
+    history = _history(n)
+    frequency, first, last, sentiment, channels = graph_schema._aggregate_history(history)
+    np_frequency, np_first, np_last, np_sentiment, np_channels = graph_schema._aggregate_history_numpy(history)
+    assert (np_frequency, np_first, np_last, np_channels) == (frequency, first, last, channels)
+    assert np_sentiment == sentiment
+    assert first == min(msg["timestamp"] for msg in history)
+    assert last == max(msg["timestamp"] for msg in history)
+    assert "" not in channels and None not in channels
+
+def test_aggregate_history_empty():
+    assert graph_schema._aggregate_history([]) == (0, None, None, 0.0, set())
+
+def test_is_valid_edge():
+    for rel_type, spec in RELATIONSHIP_TYPES.items():
+        for source in spec["valid_sources"]:
+            for target in spec["valid_targets"]:
+                assert graph_schema.is_valid_edge(source, rel_type, target)
+    assert graph_schema.is_valid_edge("User", "USER_KNOWS", "Person")
+    assert not graph_schema.is_valid_edge("Person", "USER_KNOWS", "User")
+    assert not graph_schema.is_valid_edge("User", "NOT_A_RELATIONSHIP", "Person")
+
 if __name__ == "__main__":
     test_schema_initialization()
     test_node_creation()
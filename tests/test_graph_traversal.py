@@ -0,0 +1,73 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from backend.GraphRAG.graphrag.engine.graph_traversal import GraphTraversal
+
+class FakeGraphDB:
+    """Undirected in-memory graph answering the one-hop frontier expansion"""
+    def __init__(self, edges, labels=None):
+        self.edges = edges
+        self.labels = labels or {}
+        self.calls = []
+
+    def run_query(self, query, parameters=None):
+        self.calls.append(parameters)
+        records = []
+        for node_id in parameters["node_ids"]:
+            for a, rel_type, b in self.edges:
+                if node_id not in (a, b):
+                    continue
+                other = b if node_id == a else a
+                if parameters["rel_types"] is not None and rel_type not in parameters["rel_types"]:
+                    continue
+                label = self.labels.get(other, "Person")
+                if parameters["node_types"] is not None and label not in parameters["node_types"]:
+                    continue
+                records.append({"src": node_id, "m": {"id": other}, "r": (a, rel_type, b)})
+        return records[:parameters["limit"]]
+
+EDGES = [
+    ("a", "KNOWS", "b"),
+    ("a", "KNOWS", "c"),
+    ("b", "KNOWS", "c"),
+    ("b", "WORKS_AT", "org"),
+    ("c", "KNOWS", "d"),
+    ("d", "KNOWS", "e"),
+]
+
+def test_one_query_per_hop_and_each_node_once():
+    graph_db = FakeGraphDB(EDGES, labels={"org": "Organization"})
+    result = GraphTraversal(graph_db).traverse_from_seeds(["a", "a"], max_hops=1)
+    ids = [node["id"] for node in result["nodes"]]
+    # Seeds aren't collected; "c" is reached from both "a" and "b" but collected once
+    assert ids == ["b", "c", "org", "d"]
+    assert [call["node_ids"] for call in graph_db.calls] == [["a"], ["b", "c"]]
+
+def test_max_hops_bounds_depth():
+    graph_db = FakeGraphDB(EDGES)
+    result = GraphTraversal(graph_db).traverse_from_seeds(["a"], max_hops=0)
+    assert [node["id"] for node in result["nodes"]] == ["b", "c"]
+    result = GraphTraversal(graph_db).traverse_from_seeds(["a"], max_hops=5)
+    assert {node["id"] for node in result["nodes"]} == {"b", "c", "d", "e", "org"}
+
+def test_filters_are_passed_through():
+    graph_db = FakeGraphDB(EDGES, labels={"org": "Organization"})
+    result = GraphTraversal(graph_db).traverse_from_seeds(
+        ["b"], max_hops=0, relationship_types=["WORKS_AT"], node_types=["Organization"]
+    )
+    assert [node["id"] for node in result["nodes"]] == ["org"]
+    assert result["relationships"] == [("b", "WORKS_AT", "org")]
+    unfiltered = FakeGraphDB(EDGES)
+    GraphTraversal(unfiltered).traverse_from_seeds(["b"], max_hops=0, relationship_types=[])
+    assert unfiltered.calls[0]["rel_types"] is None and unfiltered.calls[0]["node_types"] is None
+
+def test_max_nodes_per_hop_caps_collection():
+    graph_db = FakeGraphDB(EDGES)
+    result = GraphTraversal(graph_db).traverse_from_seeds(["a"], max_hops=5, max_nodes_per_hop=3)
+    assert len(result["nodes"]) == 3
+    assert graph_db.calls[0]["limit"] == 3
+
+def test_empty_seeds():
+    graph_db = FakeGraphDB(EDGES)
+    assert GraphTraversal(graph_db).traverse_from_seeds([]) == {"nodes": [], "relationships": []}
+    assert graph_db.calls == []
@@ -0,0 +1,67 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+from backend.GraphRAG.graphrag.engine import rag_engine
+from backend.GraphRAG.graphrag.engine.rag_engine import LRUCache
+
+def test_small_cache_is_one_exact_lru_shard():
+    cache = LRUCache(max_size=3, ttl=60)
+    assert len(cache.shards) == 1
+    for key in ("a", "b", "c"):
+        cache.set(key, key.upper())
+    assert cache.get("a") == "A"  # "b" is now least recently used
+    cache.set("d", "D")
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in ("a", "c", "d")] == ["A", "C", "D"]
+
+def test_shard_count_keeps_min_shard_size():
+    assert len(LRUCache(max_size=10000, n_shards=16).shards) == 16
+    cache = LRUCache(max_size=256, n_shards=16)
+    assert len(cache.shards) == 4
+    assert cache.shard_size == LRUCache.MIN_SHARD_SIZE
+    with pytest.raises(ValueError):
+        LRUCache(n_shards=3)
+
+def test_eviction_is_per_shard():
+    cache = LRUCache(max_size=128, ttl=60, n_shards=2)
+    assert len(cache.shards) == 2
+    # Integers hash to themselves, so even keys go to shard 0 and odd keys to shard 1
+    for key in range(0, 2 * cache.shard_size, 2):
+        cache.set(key, key)
+    cache.set(1, "odd")
+    cache.set(2 * cache.shard_size, "overflow")
+    assert cache.get(0) is None
+    assert cache.get(2) == 2
+    assert cache.get(1) == "odd"
+    assert all(len(shard) <= cache.shard_size for shard, _ in cache.shards)
+
+def test_overwrite_refreshes_without_evicting():
+    cache = LRUCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("a", 3)
+    cache.set("c", 4)
+    assert cache.get("a") == 3
+    assert cache.get("b") is None
+
+def test_expired_entries_are_dropped(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rag_engine.time, "time", lambda: now[0])
+    cache = LRUCache(max_size=10, ttl=5)
+    cache.set("a", 1)
+    now[0] += 4
+    assert cache.get("a") == 1
+    now[0] += 2
+    assert cache.get("a") is None
+    assert all(len(shard) == 0 for shard, _ in cache.shards)
+
+def test_delete_and_clear():
+    cache = LRUCache(max_size=1000, ttl=60)
+    for key in range(100):
+        cache.set(key, key)
+    cache.delete(5)
+    assert cache.get(5) is None
+    assert cache.get(6) == 6
+    cache.clear()
+    assert all(cache.get(key) is None for key in range(100))
@@ -0,0 +1,133 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import threading
+import pytest
+from cachetools import TTLCache
+from backend.GraphRAG.graphrag.db.graph_db import Neo4jWrapper, NODE_CACHE_SIZE, NODE_CACHE_TTL
+
+class FakeCounters:
+    def __init__(self, contains_updates):
+        self.contains_updates = contains_updates
+
+class FakeSummary:
+    def __init__(self, contains_updates):
+        self.counters = FakeCounters(contains_updates)
+
+class FakeResult:
+    def __init__(self, records, contains_updates=False):
+        self.records = records
+        self.contains_updates = contains_updates
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def single(self):
+        return self.records[0] if self.records else None
+
+    def consume(self):
+        return FakeSummary(self.contains_updates)
+
+class FakeSession:
+    """Answers node lookups with a node built from the params; anything else is a write"""
+    def __init__(self):
+        self.calls = 0
+
+    def run(self, query, parameters=None, **kwargs):
+        self.calls += 1
+        params = {**(parameters or {}), **kwargs}
+        if "RETURN n" in query:
+            return FakeResult([{"n": {"id": params.get("id"), "version": self.calls}}])
+        return FakeResult([], contains_updates=True)
+
+class FakeTransaction(FakeSession):
+    def __init__(self, outer):
+        super().__init__()
+        self.outer = outer
+        self.committed = False
+
+    def run(self, query, parameters=None, **kwargs):
+        self.outer.calls += 1
+        return super().run(query, parameters, **kwargs)
+
+    def commit(self):
+        self.committed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+class FakeTxSession(FakeSession):
+    def begin_transaction(self):
+        self.tx = FakeTransaction(self)
+        return self.tx
+
+@pytest.fixture
+def db():
+    wrapper = Neo4jWrapper.__new__(Neo4jWrapper)
+    wrapper._capabilities = {}
+    wrapper._node_cache = TTLCache(maxsize=NODE_CACHE_SIZE, ttl=NODE_CACHE_TTL)
+    wrapper._node_cache_lock = threading.Lock()
+    wrapper._bound_session = FakeSession()
+    return wrapper
+
+def test_get_node_cache_hit(db):
+    first = db.get_node("Person", {"id": "p1"})
+    second = db.get_node("Person", {"id": "p1"})
+    assert first is second
+    assert db._bound_session.calls == 1
+    db.get_node("Person", {"id": "p1"}, nocache=True)
+    assert db._bound_session.calls == 2
+
+def test_invalidate_node(db):
+    db.get_node("Person", {"id": "p1"})
+    db.get_node(None, {"id": "p1"})
+    db.invalidate_node("Person", {"id": "p1"})
+    db.get_node("Person", {"id": "p1"})
+    db.get_node(None, {"id": "p1"})
+    assert db._bound_session.calls == 4
+
+def test_run_query_write_invalidates_named_ids(db):
+    db.get_node("Person", {"id": "p1"})
+    db.get_node("Person", {"id": "p2"})
+    db.run_query("SET n.x = 1", {}, invalidates=["p1"])
+    db.get_node("Person", {"id": "p1"})
+    db.get_node("Person", {"id": "p2"})
+    # p1 re-read, p2 still cached
+    assert db._bound_session.calls == 4
+
+def test_run_query_write_without_ids_clears_cache(db):
+    db.get_node("Person", {"id": "p1"})
+    db.run_query("SET n.x = 1")
+    db.get_node("Person", {"id": "p1"})
+    assert db._bound_session.calls == 3
+
+def test_unhashable_or_non_id_props_skip_cache(db):
+    db.get_node("Person", {"id": ["p1", "p2"]})
+    db.get_node("Person", {"id": ["p1", "p2"]})
+    db.get_node("Person", {"id": "p1", "tags": {"a": 1}})
+    db.get_node("Person", {"id": "p1", "tags": {"a": 1}})
+    assert db._bound_session.calls == 4
+    assert len(db._node_cache) == 0
+
+def test_transaction_defers_invalidation_until_commit(db):
+    db._bound_session = FakeTxSession()
+    db.get_node("Person", {"id": "p1"})
+    with db.transaction() as tx_db:
+        tx_db.bulk_merge_nodes("Person", [{"id": "p1", "name": "Alice"}])
+        # Still cached until the transaction commits
+        assert ("Person", "p1") in db._node_cache
+    assert db._bound_session.tx.committed
+    assert ("Person", "p1") not in db._node_cache
+
+def test_transaction_rollback_keeps_cache(db):
+    db._bound_session = FakeTxSession()
+    db.get_node("Person", {"id": "p1"})
+    with pytest.raises(ValueError):
+        with db.transaction() as tx_db:
+            tx_db.bulk_merge_nodes("Person", [{"id": "p1"}])
+            tx_db.bulk_merge_nodes("Person", [{"id": "p2", "not_a_property": 1}])
+    assert not db._bound_session.tx.committed
+    assert ("Person", "p1") in db._node_cache